@@ -1,3 +1,4 @@
+from itertools import chain
 from os import path
 from sys import stderr
 
@@ -5,8 +6,10 @@ from pytube.exceptions import RegexMatchError as PytubeRegexMatchError
 
 from mediakit.cli.arguments import command_args
 from mediakit.cli.download import DownloadCLI
+from mediakit.media.playlist import expand_playlist_urls
 from mediakit.utils.files import (
     get_filename_from,
+    get_unique_video_urls,
     read_video_urls_from,
     file_exists,
     remove_all_temporary_files,
@@ -15,7 +18,10 @@ from mediakit.globals import global_config
 from mediakit import exceptions
 
 
-def _get_video_urls_to_download(arguments):
+DOWNLOAD_FAILURE_EXIT_CODE = 1
+
+
+def _get_video_urls_to_download(arguments, failed_playlist_urls: "list[str]"):
     was_batch_file_provided = global_config.batch_file is not None
 
     if not was_batch_file_provided:
@@ -24,12 +30,18 @@ def _get_video_urls_to_download(arguments):
     if not file_exists(global_config.batch_file):
         raise exceptions.NoSuchFile(global_config.batch_file)
 
-    video_urls_to_download = read_video_urls_from(global_config.batch_file)
+    video_urls_to_download = get_unique_video_urls(
+        expand_playlist_urls(
+            read_video_urls_from(global_config.batch_file),
+            failed_playlist_urls=failed_playlist_urls,
+        )
+    )
 
-    if len(video_urls_to_download) == 0:
+    first_video_url = next(video_urls_to_download, None)
+    if first_video_url is None:
         raise exceptions.NoVideoURLsInBatchFile(global_config.batch_file)
 
-    return video_urls_to_download
+    return chain([first_video_url], video_urls_to_download)
 
 
 def download(video_urls: "list[str]" = None):
@@ -37,10 +49,14 @@ def download(video_urls: "list[str]" = None):
 
     output_path = None
     download_cli = None
+    # Filled while the playlists of the batch file are expanded
+    failed_playlist_urls: "list[str]" = []
 
     try:
         video_urls_to_download = (
-            _get_video_urls_to_download(arguments) if video_urls is None else video_urls
+            _get_video_urls_to_download(arguments, failed_playlist_urls)
+            if video_urls is None
+            else get_unique_video_urls(video_urls)
         )
 
         output_path = path.abspath(arguments.output_path)
@@ -50,9 +66,14 @@ def download(video_urls: "list[str]" = None):
 
         download_cli = DownloadCLI(output_path, filename)
 
-        download_cli.start(video_urls_to_download, arguments.formats)
+        download_cli.start(
+            video_urls_to_download, arguments.formats, failed_playlist_urls
+        )
         download_cli.download_all()
 
+        if download_cli.has_failed_downloads():
+            return DOWNLOAD_FAILURE_EXIT_CODE
+
     except (exceptions.NoSuchFile, exceptions.NoVideoURLsInBatchFile) as exception:
         exception.show_message()
         return
@@ -71,7 +92,7 @@ def download(video_urls: "list[str]" = None):
         exceptions.UnspecifiedError().show_message()
         raise exception
     finally:
-        if output_path is not None:
+        if output_path is not None and not global_config.resume_downloads:
             remove_all_temporary_files(output_path)
         if download_cli is not None:
             download_cli.terminate()
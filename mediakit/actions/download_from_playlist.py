@@ -1,22 +1,26 @@
-from pytube import Playlist
+from itertools import chain
+
 from pytube.exceptions import RegexMatchError as PytubeRegexMatchError
 
 from mediakit import exceptions
 from mediakit.actions.download import download
 from mediakit.cli.arguments import command_args
+from mediakit.media.playlist import get_playlist_video_urls
 
 
 def download_from_playlist():
     arguments = command_args.parse_download_arguments()
 
     try:
-        playlist = Playlist(arguments.url)
-        video_urls = playlist.video_urls
+        video_urls = get_playlist_video_urls(arguments.url)
 
-        if len(video_urls) == 0:
+        # Only the first page is fetched here, the others are fetched while
+        # the videos already found are downloaded
+        first_video_url = next(video_urls, None)
+        if first_video_url is None:
             raise exceptions.EmptyPlaylistException()
 
-        download(video_urls)
+        return download(chain([first_video_url], video_urls))
 
     except exceptions.EmptyPlaylistException as exception:
         exception.show_message()
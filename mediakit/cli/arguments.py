@@ -1,8 +1,12 @@
 import sys
+from os import path
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 
 from mediakit.info import name, version, description
 from mediakit.utils import regex
+from mediakit.utils.format import parse_data_size
+from mediakit.utils.adaptive_concurrency import MAX_ADAPTIVE_CONCURRENCY
+from mediakit.constants import OutputContainers
 from mediakit.cli.colors import colored, Colors
 from mediakit.cli.screen import screen, ContentCategories
 from mediakit.globals import global_config
@@ -15,6 +19,46 @@ class GlobalArguments:
     no_colors = ["-nc", "--no-colors"]
     batch = ["-b", "--batch"]
     max_downloads_in_parallel = ["-p", "--parallel"]
+    max_conversions_in_parallel = ["-pc", "--parallel-conversions"]
+    max_metadata_loads_in_parallel = ["-pm", "--parallel-metadata"]
+    conversion_threads = ["-ct", "--conversion-threads"]
+    conversion_niceness = ["--conversion-nice"]
+    conversion_idle_io_priority = ["--conversion-idle-io"]
+    connections_per_download = ["-c", "--connections"]
+    resume_downloads = ["-r", "--resume"]
+    stream_conversion = ["-sc", "--stream-conversion"]
+    rate_limit = ["-lr", "--limit-rate"]
+    rate_limit_per_download = ["-lrd", "--limit-rate-per-download"]
+    connection_pool_size = ["--pool-size"]
+    socket_buffer_size = ["--socket-buffer-size"]
+    chunk_size = ["--chunk-size"]
+    use_cache = ["--cache"]
+    cache_directory = ["--cache-dir"]
+    cache_max_size = ["--cache-size"]
+    cache_manifests = ["--cache-manifests"]
+    manifest_cache_ttl = ["--manifest-ttl"]
+    download_archive = ["--download-archive"]
+    output_container = ["--container"]
+    no_convert = ["--no-convert"]
+
+
+ADAPTIVE_PARALLEL_LIMIT = "auto"
+ADAPTIVE_CHUNK_SIZE = "auto"
+DEFAULT_CACHE_DIRECTORY = "cache"
+
+
+def parse_parallel_limit(value):
+    if value.lower() == ADAPTIVE_PARALLEL_LIMIT:
+        return ADAPTIVE_PARALLEL_LIMIT
+
+    return int(value)
+
+
+def parse_chunk_size(value):
+    if value.lower() == ADAPTIVE_CHUNK_SIZE:
+        return None
+
+    return int(parse_data_size(value))
 
 
 class Parser(ArgumentParser):
@@ -46,9 +90,149 @@ class Parser(ArgumentParser):
         self.add_argument(
             *GlobalArguments.max_downloads_in_parallel,
             dest="max_downloads_in_parallel",
-            type=int,
+            type=parse_parallel_limit,
             default=global_config.max_downloads_in_parallel,
-            help="Set a limit to downloads in parallel",
+            help='Set a limit to downloads in parallel, or "auto" to tune it',
+        )
+        self.add_argument(
+            *GlobalArguments.max_conversions_in_parallel,
+            dest="max_conversions_in_parallel",
+            type=int,
+            default=global_config.max_conversions_in_parallel,
+            help="Set a limit to conversions in parallel",
+        )
+        self.add_argument(
+            *GlobalArguments.conversion_threads,
+            dest="conversion_threads",
+            type=int,
+            default=global_config.conversion_threads,
+            help="Set the number of threads used by each conversion",
+        )
+        self.add_argument(
+            *GlobalArguments.conversion_niceness,
+            dest="conversion_niceness",
+            type=int,
+            default=global_config.conversion_niceness,
+            help="Run conversions with the given niceness",
+        )
+        self.add_argument(
+            *GlobalArguments.conversion_idle_io_priority,
+            dest="conversion_idle_io_priority",
+            action="store_true",
+            help="Run conversions with idle disk priority",
+        )
+        self.add_argument(
+            *GlobalArguments.max_metadata_loads_in_parallel,
+            dest="max_metadata_loads_in_parallel",
+            type=int,
+            default=global_config.max_metadata_loads_in_parallel,
+            help="Set a limit to videos having their information loaded in parallel",
+        )
+        self.add_argument(
+            *GlobalArguments.connections_per_download,
+            dest="connections_per_download",
+            type=int,
+            default=global_config.connections_per_download,
+            help="Set the number of connections used to download each file",
+        )
+        self.add_argument(
+            *GlobalArguments.resume_downloads,
+            dest="resume_downloads",
+            action="store_true",
+            help="Keep partial downloads and resume them on the next run",
+        )
+        self.add_argument(
+            *GlobalArguments.stream_conversion,
+            dest="stream_conversion",
+            action="store_true",
+            help="Convert the downloads while they are being received",
+        )
+        self.add_argument(
+            *GlobalArguments.rate_limit,
+            dest="rate_limit",
+            type=parse_data_size,
+            default=global_config.rate_limit,
+            help="Limit the total download rate, in bytes per second (e.g. 2M)",
+        )
+        self.add_argument(
+            *GlobalArguments.rate_limit_per_download,
+            dest="rate_limit_per_download",
+            type=parse_data_size,
+            default=global_config.rate_limit_per_download,
+            help="Limit the download rate of each file, in bytes per second",
+        )
+        self.add_argument(
+            *GlobalArguments.connection_pool_size,
+            dest="connection_pool_size",
+            type=int,
+            default=global_config.connection_pool_size,
+            help="Set how many idle connections are kept open for each host",
+        )
+        self.add_argument(
+            *GlobalArguments.socket_buffer_size,
+            dest="socket_buffer_size",
+            type=parse_data_size,
+            default=global_config.socket_buffer_size,
+            help="Set the receive buffer size of each connection (e.g. 4M)",
+        )
+        self.add_argument(
+            *GlobalArguments.chunk_size,
+            dest="chunk_size",
+            type=parse_chunk_size,
+            default=global_config.chunk_size,
+            help='Set the size of each chunk read from the network, or "auto"',
+        )
+        self.add_argument(
+            *GlobalArguments.use_cache,
+            dest="use_cache",
+            action="store_true",
+            help="Keep downloaded streams in a cache and reuse them on later runs",
+        )
+        self.add_argument(
+            *GlobalArguments.cache_directory,
+            dest="cache_directory",
+            default=path.join(global_config.data_directory, DEFAULT_CACHE_DIRECTORY),
+            help="Set the directory of the cache",
+        )
+        self.add_argument(
+            *GlobalArguments.cache_max_size,
+            dest="cache_max_size",
+            type=parse_data_size,
+            default=global_config.cache_max_size,
+            help="Set the maximum size of the cache (e.g. 20G)",
+        )
+        self.add_argument(
+            *GlobalArguments.cache_manifests,
+            dest="cache_manifests",
+            action="store_true",
+            help="Keep video metadata and player scripts to reuse on later runs",
+        )
+        self.add_argument(
+            *GlobalArguments.manifest_cache_ttl,
+            dest="manifest_cache_ttl",
+            type=int,
+            default=global_config.manifest_cache_ttl,
+            help="Set for how many seconds the metadata of the videos is reused",
+        )
+        self.add_argument(
+            *GlobalArguments.download_archive,
+            dest="download_archive",
+            default=global_config.download_archive,
+            help="Record downloaded videos in a file and skip them on later runs",
+        )
+        self.add_argument(
+            *GlobalArguments.output_container,
+            dest="output_container",
+            choices=[OutputContainers.CONVERTED, OutputContainers.NATIVE],
+            default=global_config.output_container,
+            help='Convert to mp4/mp3, or keep the "native" containers of the streams',
+        )
+        self.add_argument(
+            *GlobalArguments.no_convert,
+            dest="output_container",
+            action="store_const",
+            const=OutputContainers.NATIVE,
+            help="Save the streams without converting them (same as --container native)",
         )
 
     def add_download_arguments(self):
@@ -84,7 +268,55 @@ def update_global_config_based_on_arguments(arguments):
         batch_file[0] if was_batch_file_provided else global_config.batch_file
     )
 
-    global_config.max_downloads_in_parallel = arguments.max_downloads_in_parallel
+    global_config.adaptive_downloads_in_parallel = (
+        arguments.max_downloads_in_parallel == ADAPTIVE_PARALLEL_LIMIT
+    )
+    global_config.max_downloads_in_parallel = (
+        MAX_ADAPTIVE_CONCURRENCY
+        if global_config.adaptive_downloads_in_parallel
+        else arguments.max_downloads_in_parallel
+    )
+    global_config.max_conversions_in_parallel = max(
+        arguments.max_conversions_in_parallel, 1
+    )
+    global_config.max_metadata_loads_in_parallel = max(
+        arguments.max_metadata_loads_in_parallel, 1
+    )
+    global_config.conversion_threads = (
+        max(arguments.conversion_threads, 1)
+        if arguments.conversion_threads is not None
+        else None
+    )
+    global_config.conversion_niceness = arguments.conversion_niceness
+    global_config.conversion_idle_io_priority = arguments.conversion_idle_io_priority
+    global_config.connections_per_download = max(
+        arguments.connections_per_download, 1
+    )
+    global_config.resume_downloads = arguments.resume_downloads
+    global_config.stream_conversion = arguments.stream_conversion
+    global_config.rate_limit = arguments.rate_limit
+    global_config.rate_limit_per_download = arguments.rate_limit_per_download
+    global_config.connection_pool_size = max(arguments.connection_pool_size, 0)
+    global_config.chunk_size = arguments.chunk_size
+    global_config.socket_buffer_size = (
+        int(arguments.socket_buffer_size)
+        if arguments.socket_buffer_size is not None
+        else None
+    )
+    global_config.cache_directory = (
+        path.abspath(path.expanduser(arguments.cache_directory))
+        if arguments.use_cache
+        else None
+    )
+    global_config.cache_max_size = int(arguments.cache_max_size)
+    global_config.cache_manifests = arguments.cache_manifests
+    global_config.manifest_cache_ttl = max(arguments.manifest_cache_ttl, 0)
+    global_config.download_archive = (
+        path.abspath(path.expanduser(arguments.download_archive))
+        if arguments.download_archive is not None
+        else None
+    )
+    global_config.output_container = arguments.output_container
 
 
 class CommandArgs:
@@ -1,14 +1,20 @@
 from os import path
 from functools import partial
-from threading import Thread
+from collections import deque
+from queue import Queue
+from threading import Condition, Event, Lock, Thread, current_thread
 from time import sleep
-from typing import Callable
-from pytube import YouTube
+from typing import Callable, Iterable
+from pytube import Stream, YouTube
 
 from mediakit.cli.screen import screen, ContentCategories
 from mediakit.cli.colors import colored, Colors
 from mediakit.media.download import DownloadStatusCodes, MediaResource
-from mediakit.utils.format import parse_int
+from mediakit.media.download_archive import get_download_archive
+from mediakit.media.segmented_download import downloads_stopped
+from mediakit.media.shared_download import plan_shared_stream_downloads
+from mediakit.media.stream_index import StreamIndex
+from mediakit.media.youtube import CachedYouTube
 from mediakit.cli.loadble_cli import LoadableCLI
 from mediakit.cli.download.download_cli_formatter import DownloadCLIFormatter
 from mediakit.cli.download.download_cli_store import DownloadCLIStore
@@ -22,7 +28,13 @@ from mediakit.constants import (
 )
 from mediakit.globals import global_config
 from mediakit import exceptions
-from mediakit.utils.lists import flatten_list
+from mediakit.utils import regex
+from mediakit.utils.worker_pool import run_in_bounded_pool
+from mediakit.utils.adaptive_concurrency import (
+    AdaptiveConcurrencyController,
+    load_concurrency_hint,
+    save_concurrency_hint,
+)
 
 
 class DownloadCLI(LoadableCLI):
@@ -33,132 +45,102 @@ class DownloadCLI(LoadableCLI):
 
         self.formatter = DownloadCLIFormatter(self.store)
 
-    def start(self, video_urls_to_download: "list[str]", formats):
-        self._show_header(video_urls_to_download)
+    def start(
+        self,
+        video_urls_to_download: "Iterable[str]",
+        formats,
+        failed_playlist_urls: "list[str]" = None,
+    ):
+        self._show_header()
 
         if not FFMPEG_BINARY:
             exceptions.FFMPEGNotAvailable().show_message()
             return
 
-        self.mark_as_loading(True, len(video_urls_to_download))
-        self._register_videos_to_download(video_urls_to_download, formats)
-        self.mark_as_loading(False)
+        # Videos are loaded while downloading, as soon as download_all starts
+        self.store.video_urls_to_load = video_urls_to_download
+        self.store.formats_to_load = formats
+        if failed_playlist_urls is not None:
+            self.store.failed_playlist_urls = failed_playlist_urls
+
+        # Batch files and playlists are read lazily, so their size is unknown
+        is_loading_several_videos = (
+            not isinstance(video_urls_to_download, list)
+            or len(video_urls_to_download) > 1
+        )
+        self.store.is_single_video_input = (
+            not is_loading_several_videos and not global_config.batch_file
+        )
+        self.mark_as_loading(True, is_loading_several_videos)
 
-    def mark_as_loading(self, is_loading: bool, number_of_videos_being_loaded=1):
+    def mark_as_loading(self, is_loading: bool, is_loading_several_videos=False):
         self.store.is_loading = is_loading
 
         if is_loading:
             loading_label = (
-                "Loading videos"
-                if number_of_videos_being_loaded > 1
-                else "Loading video"
+                "Loading videos" if is_loading_several_videos else "Loading video"
             )
             self._show_loading_label(loading_label)
         else:
             self._remove_loading_label()
 
-    def _show_header(self, video_urls_to_download):
-        screen.append_content(self.formatter.format_header())
+    def _show_header(self):
+        screen.release_content(screen.append_content(self.formatter.format_header()))
 
         if global_config.batch_file:
-            self._show_batch_file_info(video_urls_to_download)
-
-    def _register_videos_to_download(self, video_urls: str, formats: "list[str]"):
-        videos = [YouTube(video_url) for video_url in video_urls]
-        videos_data = self._load_videos_data(videos, formats)
+            self._show_batch_file_info()
 
-        available_formats_list: list = []
-        media_resources_list: "list[list[MediaResource]]" = []
-        skipped_formats_list: list = []
-        formats_replaced_by_fallback_list: list = []
-
-        for (
+    def _register_videos_to_download(
+        self, video_urls: "Iterable[str]", formats: "list[str]"
+    ):
+        for video, (
             available_formats,
             media_resources_to_download,
             skipped_formats,
             formats_replaced_by_fallback,
-        ) in videos_data:
-            available_formats_list.append(available_formats)
-            media_resources_list.append(media_resources_to_download)
-            skipped_formats_list.append(skipped_formats)
-            formats_replaced_by_fallback_list.append(formats_replaced_by_fallback)
-
-        non_flatten_videos = [[video] for video in videos]
-        non_flatten_available_formats = [
-            [available_format] for available_format in available_formats_list
-        ]
-        non_flatten_media_resources = [
-            media_resources for media_resources in media_resources_list
-        ]
-        non_flatten_skipped_formats = [
-            [skipped_formats] for skipped_formats in skipped_formats_list
-        ]
-        non_flatten_formats_replaced_by_fallback = [
-            [replaced_formats] for replaced_formats in formats_replaced_by_fallback_list
-        ]
-
-        for video_index in range(len(non_flatten_videos)):
-            source_video = non_flatten_videos[video_index][0]
-            available_formats = non_flatten_available_formats[video_index][0]
-            media_resources_to_download = non_flatten_media_resources[video_index]
-            skipped_formats = non_flatten_skipped_formats[video_index][0]
-            replaced_formats = non_flatten_formats_replaced_by_fallback[video_index][0]
-
-            if len(media_resources_to_download) > 0:
-                non_flatten_videos[video_index] = [
-                    YouTube(source_video.watch_url) for _ in media_resources_to_download
-                ]
-                non_flatten_media_resources[video_index] = [
-                    media_resources_to_download[media_resource_index].copy(
-                        source=non_flatten_videos[video_index][media_resource_index]
-                    )
-                    for media_resource_index in range(len(media_resources_to_download))
-                ]
-                non_flatten_available_formats[video_index] = [
-                    available_formats for _ in media_resources_to_download
-                ]
-                non_flatten_skipped_formats[video_index] = [
-                    skipped_formats for _ in media_resources_to_download
-                ]
-                non_flatten_formats_replaced_by_fallback[video_index] = [
-                    replaced_formats for _ in media_resources_to_download
-                ]
-            else:
-                non_flatten_videos[video_index] = [YouTube(source_video.watch_url)]
-                non_flatten_media_resources[video_index] = [None]
-                non_flatten_available_formats[video_index] = [available_formats]
-                non_flatten_skipped_formats[video_index] = [skipped_formats]
-                non_flatten_formats_replaced_by_fallback[video_index] = [
-                    replaced_formats
-                ]
-
-        flatten_videos = flatten_list(non_flatten_videos)
-
-        self.store.prepare_store(len(flatten_videos))
-        self.store.videos = flatten_videos
-
-        self.store.media_resources_to_download = flatten_list(
-            non_flatten_media_resources
-        )
-        self.store.available_formats = flatten_list(non_flatten_available_formats)
-        self.store.skipped_formats = flatten_list(non_flatten_skipped_formats)
-        self.store.formats_replaced_by_fallback = flatten_list(
-            non_flatten_formats_replaced_by_fallback
-        )
+            download_archive_entries,
+        ) in self._load_videos_data(video_urls, formats):
+            plan_shared_stream_downloads(media_resources_to_download)
+
+            media_resources = (
+                media_resources_to_download
+                if len(media_resources_to_download) > 0
+                else [None]
+            )
+            media_resources_archive_entries = (
+                download_archive_entries
+                if len(media_resources_to_download) > 0
+                else [[]]
+            )
 
-        for video_index in range(len(self.store.videos)):
-            video = self.store.videos[video_index]
+            video_indexes = [
+                self.store.register_video(
+                    video,
+                    media_resource,
+                    available_formats,
+                    skipped_formats,
+                    formats_replaced_by_fallback,
+                    archive_entries,
+                )
+                for media_resource, archive_entries in zip(
+                    media_resources, media_resources_archive_entries
+                )
+            ]
 
-            def handle_download_progress(video_index, _stream, _chunk, bytes_remaining):
-                self._handle_download_progress(video_index, bytes_remaining)
+            # All resources of a video share its streams, so each progress
+            # update is dispatched to the resources of that video
+            def handle_download_progress(video_indexes, stream, chunk, bytes_remaining):
+                self._handle_download_progress(
+                    video_indexes, stream, chunk, bytes_remaining
+                )
 
             video.register_on_progress_callback(
-                partial(handle_download_progress, video_index)
+                partial(handle_download_progress, video_indexes)
             )
 
-    def download_all(self):
-        self._prerender_download_ui_components()
+            yield video_indexes
 
+    def download_all(self):
         at_least_one_file_was_downloaded = False
 
         self.store.download_ui_update_thread = Thread(
@@ -166,65 +148,256 @@ class DownloadCLI(LoadableCLI):
         )
         self.store.download_ui_update_thread.start()
 
-        video_indexes_left_to_download = list(range(len(self.store.videos) - 1, -1, -1))
-        ongoing_download_threads: "list[Thread]" = []
+        # Videos are queued as they are registered, while they are loaded below
+        video_indexes_left_to_download = deque()
 
-        def download(video_index: int, on_finish: Callable[..., None]):
-            nonlocal at_least_one_file_was_downloaded
+        ongoing_download_threads: "set[Thread]" = set()
+
+        unfinished_videos = Condition()
+        number_of_unfinished_videos = 0
 
+        conversion_queue = Queue(maxsize=global_config.max_downloads_in_parallel)
+
+        download_slots_lock = Lock()
+        number_of_active_downloads = 0
+
+        if global_config.adaptive_downloads_in_parallel:
+            self.store.concurrency_controller = AdaptiveConcurrencyController(
+                initial_concurrency=load_concurrency_hint() or 1
+            )
+
+        def download(video_index: int, on_finish: Callable[..., None]):
             media_resource = self.store.media_resources_to_download[video_index]
 
             self._create_download_progress(video_index, media_resource)
 
-            media_resource.download()
+            try:
+                media_resource.download_streams()
+                conversion_queue.put(video_index)
+            except Exception as error:
+                if self.store.concurrency_controller is not None:
+                    self.store.concurrency_controller.record_error()
+                self._fail_download_progress(video_index, error)
+                finish_video(video_index)
+            finally:
+                # Failed downloads must also free their slot for the next ones
+                on_finish()
+
+                with download_slots_lock:
+                    ongoing_download_threads.discard(current_thread())
+
+        def convert_downloaded_resources():
+            nonlocal at_least_one_file_was_downloaded
 
-            self._end_download_progress(video_index)
-            at_least_one_file_was_downloaded = True
+            while True:
+                video_index = conversion_queue.get()
+                if video_index is None:
+                    return
 
-            on_finish()
+                media_resource = self.store.media_resources_to_download[video_index]
+
+                # The queue is still drained, so that no download waits on it
+                if downloads_stopped.is_set():
+                    continue
+
+                try:
+                    media_resource.convert()
+                except Exception as error:
+                    self._fail_download_progress(video_index, error)
+                    finish_video(video_index)
+                    continue
+
+                self._record_in_download_archive(video_index)
+                self._end_download_progress(video_index)
+                finish_video(video_index)
+                at_least_one_file_was_downloaded = True
+
+        def finish_video(video_index: int):
+            nonlocal number_of_unfinished_videos
+
+            self._release_video(video_index)
+
+            with unfinished_videos:
+                number_of_unfinished_videos -= 1
+                unfinished_videos.notify_all()
+
+        def has_room_for_more_videos():
+            return number_of_unfinished_videos < self._get_max_unfinished_videos()
+
+        conversion_threads = [
+            Thread(target=convert_downloaded_resources, daemon=True)
+            for _ in range(global_config.max_conversions_in_parallel)
+        ]
+        for thread in conversion_threads:
+            thread.start()
 
         def start_next_download():
-            if len(video_indexes_left_to_download) == 0:
-                return
+            if len(video_indexes_left_to_download) == 0 or downloads_stopped.is_set():
+                return False
 
-            video_index = video_indexes_left_to_download.pop()
+            video_index = video_indexes_left_to_download.popleft()
 
             try:
                 self._show_download_summary(video_index)
             except exceptions.NoAvailableSpecifiedFormats as exception:
                 exception.show_message()
-                start_next_download()
-                return
+                finish_video(video_index)
+                return start_next_download()
 
             should_ask_confirmation_to_download = (
                 not global_config.answer_yes_to_all_questions
-                and len(self.store.videos) == 1
+                and self._is_single_download()
             )
             if should_ask_confirmation_to_download:
                 user_has_confirmed = self._ask_for_confirmation_to_download(video_index)
                 if not user_has_confirmed:
-                    return
+                    finish_video(video_index)
+                    return False
 
             download_thread = Thread(
-                target=partial(download, video_index, start_next_download)
+                target=partial(download, video_index, finish_download)
             )
-            ongoing_download_threads.append(download_thread)
+            ongoing_download_threads.add(download_thread)
             download_thread.start()
 
-        number_of_starter_videos = min(
-            global_config.max_downloads_in_parallel,
-            len(video_indexes_left_to_download),
+            return True
+
+        def fill_download_slots():
+            nonlocal number_of_active_downloads
+
+            with download_slots_lock:
+                while (
+                    number_of_active_downloads < self._get_max_downloads_in_parallel()
+                    and len(video_indexes_left_to_download) > 0
+                    and not downloads_stopped.is_set()
+                ):
+                    if start_next_download():
+                        number_of_active_downloads += 1
+
+        def release_download_slot():
+            nonlocal number_of_active_downloads
+
+            with download_slots_lock:
+                number_of_active_downloads -= 1
+
+        def finish_download():
+            release_download_slot()
+            fill_download_slots()
+
+        def join_conversions():
+            for _ in conversion_threads:
+                conversion_queue.put(None)
+            for thread in conversion_threads:
+                thread.join()
+
+        def stop_all_downloads():
+            # Queued videos are not started and ongoing downloads end at their
+            # next chunk, so no file is still being written once this returns
+            downloads_stopped.set()
+
+            join_ongoing_downloads()
+            join_conversions()
+
+        def join_ongoing_downloads():
+            while True:
+                with download_slots_lock:
+                    download_threads = list(ongoing_download_threads)
+
+                if len(download_threads) == 0:
+                    return
+
+                for thread in download_threads:
+                    thread.join()
+
+        concurrency_tuning_stopped = Event()
+
+        def keep_download_concurrency_tuned():
+            while not concurrency_tuning_stopped.wait(
+                self.store.CONCURRENCY_TUNING_INTERVAL
+            ):
+                self.store.concurrency_controller.update()
+                fill_download_slots()
+
+        concurrency_tuning_thread = Thread(
+            target=keep_download_concurrency_tuned, daemon=True
         )
+        if self.store.concurrency_controller is not None:
+            concurrency_tuning_thread.start()
+
+        try:
+            fill_download_slots()
+
+            # Each video starts downloading as soon as it is loaded, while the
+            # remaining ones keep loading
+            number_of_videos_loaded = 0
+
+            try:
+                for video_indexes in self._register_videos_to_download(
+                    self.store.video_urls_to_load, self.store.formats_to_load
+                ):
+                    number_of_videos_loaded += 1
+                    if self._has_loaded_all_videos(number_of_videos_loaded):
+                        self.mark_as_loading(False)
+
+                    with unfinished_videos:
+                        number_of_unfinished_videos += len(video_indexes)
+
+                    self._prerender_download_ui_components(video_indexes)
+                    video_indexes_left_to_download.extend(video_indexes)
+
+                    fill_download_slots()
 
-        for _ in range(number_of_starter_videos):
-            start_next_download()
+                    # Only a bounded part of the batch is loaded ahead, so memory
+                    # does not grow with the number of videos
+                    with unfinished_videos:
+                        unfinished_videos.wait_for(has_room_for_more_videos)
+            finally:
+                self.mark_as_loading(False)
 
-        for thread in ongoing_download_threads:
-            thread.join()
+            self._show_archived_videos_info()
+            self._show_failed_videos_warning()
+            self._show_failed_playlists_warning()
+
+            join_ongoing_downloads()
+
+            if self.store.concurrency_controller is not None:
+                concurrency_tuning_stopped.set()
+                concurrency_tuning_thread.join()
+
+                join_ongoing_downloads()
+
+                save_concurrency_hint(
+                    self.store.concurrency_controller.best_concurrency
+                )
+
+            join_conversions()
+        except KeyboardInterrupt:
+            stop_all_downloads()
+            raise
 
         if at_least_one_file_was_downloaded:
             self._show_success_message()
 
+        self._show_failed_downloads_error()
+
+    def has_failed_downloads(self):
+        return len(self.store.failed_downloads) > 0
+
+    def _get_max_unfinished_videos(self):
+        # Videos waiting for a download slot or a conversion are included, so
+        # that neither runs out of videos while the next ones load
+        return (
+            self.store.UNFINISHED_VIDEOS_PER_DOWNLOAD_SLOT
+            * global_config.max_downloads_in_parallel
+            + global_config.max_conversions_in_parallel
+        )
+
+    def _get_max_downloads_in_parallel(self):
+        if self.store.concurrency_controller is not None:
+            return self.store.concurrency_controller.target_concurrency
+
+        return global_config.max_downloads_in_parallel
+
     def _show_download_summary(self, video_index: int):
         screen.update_content(
             self.store.video_headings[video_index],
@@ -236,7 +409,7 @@ class DownloadCLI(LoadableCLI):
                 self.store.available_formats[video_index]
             )
 
-        if len(self.store.videos) == 1:
+        if self._is_single_download():
             screen.update_content(
                 self.store.ready_to_download_labels[video_index],
                 self.formatter.format_ready_to_download_label(video_index),
@@ -257,14 +430,34 @@ class DownloadCLI(LoadableCLI):
     def _create_download_progress(
         self, video_index: int, media_resource: MediaResource
     ):
-        self.store.downloading_media_resources[video_index] = media_resource
-        screen.update_content(
-            self.store.download_progress_uis[video_index],
-            self.formatter.format_current_download_progress(video_index),
+        with self.store.progress_lock:
+            self.store.downloading_media_resources[video_index] = media_resource
+            screen.update_content(
+                self.store.download_progress_uis[video_index],
+                self.formatter.format_current_download_progress(video_index),
+            )
+
+    def _has_loaded_all_videos(self, number_of_videos_loaded: int):
+        number_of_videos_processed = number_of_videos_loaded + len(
+            self.store.failed_video_urls
+        )
+        return (
+            self.store.has_read_all_video_urls
+            and number_of_videos_processed == self.store.number_of_video_urls_read
         )
 
-    def _prerender_download_ui_components(self):
-        for video_index in range(len(self.store.videos)):
+    def _is_single_video_url(self):
+        # Decided by the input, as archived videos may leave a single URL to load
+        # from a batch file or playlist
+        return self.store.is_single_video_input
+
+    def _is_single_download(self):
+        return (
+            self._is_single_video_url() and self.store.number_of_videos_registered == 1
+        )
+
+    def _prerender_download_ui_components(self, video_indexes: "list[int]"):
+        for video_index in video_indexes:
             self.store.video_headings[video_index] = screen.append_content("")
             self.store.ready_to_download_labels[video_index] = screen.append_content("")
             self.store.download_confirmation_prompts[
@@ -273,39 +466,17 @@ class DownloadCLI(LoadableCLI):
             self.store.download_progress_uis[video_index] = screen.append_content("")
 
     def _keep_download_progress_ui_updated(self):
-        has_detailed_download_info_on_screen = [True for _ in self.store.videos]
-
         while not self.store.is_terminated:
-            self._update_all_download_progress_uis(has_detailed_download_info_on_screen)
+            self._update_all_download_progress_uis()
             sleep(self.store.PROGRESS_UI_UPDATE_INTERVAL)
 
-    def _update_all_download_progress_uis(
-        self, has_detailed_download_info_on_screen: "list[bool]"
-    ):
-        for video_index in range(len(self.store.videos)):
-            media_resource = self.store.media_resources_to_download[video_index]
-
-            if media_resource is None:
-                continue
-
-            should_clear_detailed_download_info = (
-                media_resource.download_status == DownloadStatusCodes.DONE
-                and has_detailed_download_info_on_screen[video_index]
-            )
-
-            if should_clear_detailed_download_info:
-                self._clear_detailed_download_info_from_screen(video_index)
-                has_detailed_download_info_on_screen[video_index] = False
-
-        videos_with_downloading_media_resources = [
-            video_index
-            for video_index in range(len(self.store.videos))
-            if self.store.downloading_media_resources[video_index] is not None
-        ]
-
-        for video_index in videos_with_downloading_media_resources:
-            self._update_download_progress_ui(video_index)
-            self._update_progress_ui_interval_if_necessary(video_index)
+    def _update_all_download_progress_uis(self):
+        # Only the videos being downloaded or converted are visited, so each
+        # update does not grow with the number of videos
+        with self.store.progress_lock:
+            for video_index in list(self.store.downloading_media_resources):
+                self._update_download_progress_ui(video_index)
+                self._update_progress_ui_interval_if_necessary(video_index)
 
     def _update_download_progress_ui(self, video_index: int):
         screen.update_content(
@@ -322,31 +493,63 @@ class DownloadCLI(LoadableCLI):
         if self.store.PROGRESS_UI_UPDATE_INTERVAL != required_interval:
             self.store.PROGRESS_UI_UPDATE_INTERVAL = required_interval
 
-    def _handle_download_progress(self, video_index: int, bytes_remaining: int):
-        media_resource = self.store.downloading_media_resources[video_index]
+    def _handle_download_progress(
+        self,
+        video_indexes: "list[int]",
+        stream: Stream,
+        chunk: bytes,
+        bytes_remaining: int,
+    ):
+        if self.store.concurrency_controller is not None:
+            self.store.concurrency_controller.record_bytes(len(chunk))
 
-        if media_resource is None:
-            return
+        for video_index in video_indexes:
+            media_resource = self.store.downloading_media_resources.get(video_index)
 
-        downloading_stream = media_resource.downloading_stream
+            if media_resource is not None:
+                media_resource.update_bytes_remaining(stream, bytes_remaining)
 
-        if media_resource.output_type == "videoaudio":
-            if downloading_stream is media_resource.video:
-                media_resource.video_bytes_remaining = bytes_remaining
-            elif downloading_stream is media_resource.audio:
-                media_resource.audio_bytes_remaining = bytes_remaining
+    def _end_download_progress(self, video_index: int):
+        with self.store.progress_lock:
+            self._clear_detailed_download_info_from_screen(video_index)
+            self._update_download_progress_ui(video_index)
 
-        if media_resource.output_type == "videoonly":
-            media_resource.video_bytes_remaining = bytes_remaining
+            self.store.downloading_media_resources.pop(video_index, None)
 
-        if media_resource.output_type == "audio":
-            media_resource.audio_bytes_remaining = bytes_remaining
+    def _fail_download_progress(self, video_index: int, error: Exception):
+        with self.store.progress_lock:
+            media_resource = self.store.downloading_media_resources[video_index]
+            media_resource.download_status = DownloadStatusCodes.FAILED
 
-    def _end_download_progress(self, video_index: int):
-        self._update_download_progress_ui(video_index)
+            screen.update_content(
+                self.store.download_progress_uis[video_index],
+                self.formatter.format_failed_download_progress(video_index, error),
+            )
+            self.store.failed_downloads.append(
+                (
+                    self.formatter.format_video_title(video_index),
+                    media_resource.formatted_definition,
+                    error,
+                )
+            )
 
-        self.store.downloading_media_resources[video_index] = None
-        self.store.download_progress_uis[video_index] = None
+            self.store.downloading_media_resources.pop(video_index, None)
+
+    def _release_video(self, video_index: int):
+        with self.store.progress_lock:
+            video_screen_contents = [
+                video_screen_content
+                for video_screen_content in [
+                    self.store.video_headings.get(video_index),
+                    self.store.ready_to_download_labels.get(video_index),
+                    self.store.download_confirmation_prompts.get(video_index),
+                    self.store.download_progress_uis.get(video_index),
+                ]
+                if video_screen_content is not None
+            ]
+            screen.release_content(*video_screen_contents)
+
+            self.store.release_video(video_index)
 
     def _show_success_message(self):
         screen.append_content(
@@ -371,7 +574,7 @@ class DownloadCLI(LoadableCLI):
             screen.update_content(confirmation_prompt, "")
 
     def terminate(self):
-        self._update_all_download_progress_uis([True for _ in self.store.videos])
+        self._update_all_download_progress_uis()
 
         self.store.loading_label = None
         self.store.is_loading = False
@@ -387,92 +590,177 @@ class DownloadCLI(LoadableCLI):
             and len(self.store.skipped_formats[video_index]) > 0
         )
 
-    def _show_batch_file_info(self, valid_video_urls_in_batch_file):
+    def _record_in_download_archive(self, video_index: int):
+        download_archive = get_download_archive()
+        if download_archive is None:
+            return
+
+        video_id = self.store.videos[video_index].video_id
+        for download_format, definition in self.store.download_archive_entries[
+            video_index
+        ]:
+            download_archive.record(video_id, download_format, definition)
+
+    def _show_archived_videos_info(self):
+        if self.store.number_of_archived_videos > 0:
+            screen.append_content(
+                self.formatter.format_archived_videos_info(),
+                ContentCategories.INFO,
+            )
+
+    def _show_failed_videos_warning(self):
+        if len(self.store.failed_video_urls) > 0:
+            screen.append_content(
+                self.formatter.format_failed_videos_warning(),
+                ContentCategories.WARNING,
+            )
+
+    def _show_failed_playlists_warning(self):
+        if len(self.store.failed_playlist_urls) > 0:
+            screen.append_content(
+                self.formatter.format_failed_playlists_warning(),
+                ContentCategories.WARNING,
+            )
+
+    def _show_failed_downloads_error(self):
+        if self.has_failed_downloads():
+            screen.append_content(
+                self.formatter.format_failed_downloads_error(),
+                ContentCategories.ERROR,
+            )
+
+    def _show_batch_file_info(self):
         batch_filename = path.basename(global_config.batch_file)
 
-        screen.append_content(
+        batch_file_info_header = screen.append_content(
             self.formatter.format_batch_file_info_header(batch_filename),
             ContentCategories.INFO,
         )
-        screen.append_content(
-            self.formatter.format_batch_file_info_body(valid_video_urls_in_batch_file),
-            ContentCategories.INFO,
+        screen.release_content(batch_file_info_header)
+
+    def _show_number_of_video_urls_read(self):
+        # The batch file is read while downloading, so the number of URLs is
+        # only shown once all of them have been read
+        if global_config.batch_file:
+            batch_file_info_body = screen.append_content(
+                self.formatter.format_batch_file_info_body(
+                    self.store.number_of_video_urls_read
+                ),
+                ContentCategories.INFO,
+            )
+            screen.release_content(batch_file_info_body)
+
+    def _get_requested_formats(self, formats: "list[str]"):
+        if len(formats) == 0:
+            return [("videoaudio", "max")]
+
+        grouped_formats, _ = self._group_and_validate_formats(
+            [selected_format.lower() for selected_format in formats]
         )
 
-    def _load_videos_data(self, videos: "list[YouTube]", formats):
-        videos_data = [None for _ in videos]
+        return [(group["format"], group["definition"]) for group in grouped_formats]
 
-        def load_video(video_index: int):
-            videos_data[video_index] = self._load_video_data(
-                videos[video_index], formats
-            )
+    def _is_archived(self, video_url: str, requested_formats: "list[tuple]"):
+        download_archive = get_download_archive()
+        video_id = regex.extract_video_id(video_url)
 
-        loading_threads: "list[Thread]" = []
-        for video_index in range(len(videos)):
-            thread = Thread(target=partial(load_video, video_index))
-            loading_threads.append(thread)
-            thread.start()
+        if download_archive is None or video_id is None:
+            return False
+
+        return len(requested_formats) > 0 and all(
+            download_archive.contains(video_id, download_format, definition)
+            for download_format, definition in requested_formats
+        )
+
+    def _read_video_urls(self, video_urls: "Iterable[str]", formats: "list[str]"):
+        requested_formats = self._get_requested_formats(formats)
+
+        for video_url in video_urls:
+            # Archived videos are skipped before any of their metadata is loaded
+            if self._is_archived(video_url, requested_formats):
+                self.store.number_of_archived_videos += 1
+                continue
+
+            self.store.number_of_video_urls_read += 1
+            yield video_url
+
+        self.store.has_read_all_video_urls = True
+        self._show_number_of_video_urls_read()
+
+    def _load_videos_data(self, video_urls: "Iterable[str]", formats):
+        def load_video(video_url: str):
+            video = CachedYouTube(video_url)
+            return video, self._load_video_data(video, formats)
+
+        number_of_workers = global_config.max_metadata_loads_in_parallel
+        loaded_videos = run_in_bounded_pool(
+            load_video,
+            self._read_video_urls(video_urls, formats),
+            number_of_workers,
+            prefetch_window=(
+                number_of_workers * self.store.METADATA_PREFETCH_WINDOW_PER_WORKER
+            ),
+        )
+
+        for _, video_url, loaded_video, error in loaded_videos:
+            if error is not None:
+                if self._is_single_video_url():
+                    raise error
 
-        for ongoing_thread in loading_threads:
-            ongoing_thread.join()
+                self.store.failed_video_urls.append(video_url)
+                continue
 
-        return videos_data
+            yield loaded_video
 
     def _load_video_data(self, video: YouTube, formats):
-        available_formats = self._get_available_formats(video)
+        stream_index = StreamIndex(video.streams)
+        available_formats = self._get_available_formats(stream_index)
 
         (
             media_resources_to_download,
             skipped_formats,
             formats_replaced_by_fallback,
-        ) = self._get_media_resources_to_download(video, formats)
+            download_archive_entries,
+        ) = self._get_media_resources_to_download(video, stream_index, formats)
 
         return (
             available_formats,
             media_resources_to_download,
             skipped_formats,
             formats_replaced_by_fallback,
+            download_archive_entries,
         )
 
-    def _get_available_formats(self, video: YouTube):
-        video_streams = video.streams.filter(type="video")
-        audio_streams = video.streams.filter(type="audio")
-
-        available_formats = {
-            "video": set(),
-            "audio": set(),
-        }
-        for stream in video_streams:
-            if stream.resolution is not None:
-                available_formats["video"].add(stream.resolution)
-        for stream in audio_streams:
-            available_formats["audio"].add(stream.abr)
-
-        available_formats_sorted_by_definition = {
-            "video": list(reversed(sorted(available_formats["video"], key=parse_int))),
-            "audio": list(reversed(sorted(available_formats["audio"], key=parse_int))),
+    def _get_available_formats(self, stream_index: StreamIndex):
+        return {
+            "video": list(stream_index.available_definitions["video"]),
+            "audio": list(stream_index.available_definitions["audio"]),
         }
 
-        return available_formats_sorted_by_definition
-
-    def _get_media_resources_to_download(self, video: YouTube, formats):
+    def _get_media_resources_to_download(
+        self, video: YouTube, stream_index: StreamIndex, formats
+    ):
         if len(formats) == 0:
             default_media_resource = MediaResource(
                 video,
                 "videoaudio",
                 output_path=self.store.output_path,
                 filename=self.store.filename,
+                stream_index=stream_index,
             )
 
-            return [default_media_resource], [], []
+            return [default_media_resource], [], [], [[("videoaudio", "max")]]
 
         lowecased_formats = [selected_format.lower() for selected_format in formats]
         grouped_formats, invalid_formats = self._group_and_validate_formats(
             lowecased_formats
         )
 
+        download_archive = get_download_archive()
+
         media_resources_to_download = []
-        resources_registered_to_download = set()
+        download_archive_entries = []
+        resources_registered_to_download = {}
         skipped_formats = [invalid_format for invalid_format in invalid_formats]
         formats_replaced_by_fallback = []
 
@@ -488,8 +776,14 @@ class DownloadCLI(LoadableCLI):
 
             should_append_format_to_filename = definitions_count[download_format] > 1
 
+            is_archived = download_archive is not None and download_archive.contains(
+                video.video_id, download_format, definition
+            )
+            if is_archived:
+                continue
+
             available_definition = self._get_available_definition(
-                video, download_format, definition
+                stream_index, download_format, definition
             )
 
             if available_definition is None:
@@ -507,10 +801,11 @@ class DownloadCLI(LoadableCLI):
                     }
                 )
 
-            if (
-                download_format,
-                available_definition,
-            ) in resources_registered_to_download:
+            resource_key = (download_format, available_definition)
+            if resource_key in resources_registered_to_download:
+                resources_registered_to_download[resource_key].append(
+                    (download_format, definition)
+                )
                 continue
 
             if should_append_format_to_filename:
@@ -531,17 +826,20 @@ class DownloadCLI(LoadableCLI):
                 definition=available_definition,
                 filename=self.store.filename,
                 filename_suffix=filename_suffix,
+                stream_index=stream_index,
             )
 
+            archive_entries = [(download_format, definition)]
+
             media_resources_to_download.append(media_resource)
-            resources_registered_to_download.add(
-                (download_format, available_definition)
-            )
+            download_archive_entries.append(archive_entries)
+            resources_registered_to_download[resource_key] = archive_entries
 
         return (
             media_resources_to_download,
             skipped_formats,
             formats_replaced_by_fallback,
+            download_archive_entries,
         )
 
     def _group_and_validate_formats(self, formats):
@@ -586,7 +884,9 @@ class DownloadCLI(LoadableCLI):
 
         return grouped_formats, invalid_formats
 
-    def _get_available_definition(self, video: YouTube, base_format, base_definition):
+    def _get_available_definition(
+        self, stream_index: StreamIndex, base_format, base_definition
+    ):
         if base_format.startswith("video"):
             is_valid_definition = (
                 base_definition in VIDEO_DEFINITIONS
@@ -600,7 +900,9 @@ class DownloadCLI(LoadableCLI):
 
         possible_definition = base_definition
         while possible_definition is not None:
-            if self._is_definition_available(video, base_format, possible_definition):
+            if self._is_definition_available(
+                stream_index, base_format, possible_definition
+            ):
                 return possible_definition
 
             possible_definition = VIDEO_DEFINITIONS_ALIASES.get(
@@ -616,26 +918,10 @@ class DownloadCLI(LoadableCLI):
         return None
 
     def _is_definition_available(
-        self, video: YouTube, base_format: str, definition: str
+        self, stream_index: StreamIndex, base_format: str, definition: str
     ):
         if base_format.startswith("video"):
             final_definition = VIDEO_DEFINITIONS_ALIASES.get(definition, definition)
+            return stream_index.has_definition("video", final_definition)
 
-            if final_definition == "max":
-                video_streams = video.streams.filter(type="video")
-                return len(video_streams) > 0
-
-            video_streams_with_specified_resolution = video.streams.filter(
-                type="video", resolution=final_definition
-            )
-            return len(video_streams_with_specified_resolution) > 0
-
-        else:
-            if definition == "max":
-                audio_streams = video.streams.filter(type="audio")
-                return len(audio_streams) > 0
-
-            audio_streams_with_specified_resolution = video.streams.filter(
-                type="audio", abr=definition
-            )
-            return len(audio_streams_with_specified_resolution) > 0
+        return stream_index.has_definition("audio", definition)
@@ -1,4 +1,5 @@
 from math import floor
+from subprocess import CalledProcessError
 
 from mediakit.info import name, version
 from mediakit.globals import global_config
@@ -29,9 +30,7 @@ class DownloadCLIFormatter:
             + "...\n"
         )
 
-    def format_batch_file_info_body(self, valid_video_urls_in_batch_file):
-        number_of_valid_urls = len(valid_video_urls_in_batch_file)
-
+    def format_batch_file_info_body(self, number_of_valid_urls: int):
         return (
             "Found "
             + colored(
@@ -44,9 +43,89 @@ class DownloadCLIFormatter:
                 if number_of_valid_urls > 1
                 else colored("video URL", fore=Colors.fore.CYAN)
             )
-            + ". Preparing to download...\n"
+            + ".\n"
+        )
+
+    def format_archived_videos_info(self):
+        number_of_archived_videos = self.store.number_of_archived_videos
+
+        return (
+            "Skipped "
+            + colored(
+                f"{number_of_archived_videos} "
+                + ("videos" if number_of_archived_videos > 1 else "video"),
+                fore=Colors.fore.CYAN,
+                style=Colors.style.BRIGHT,
+            )
+            + " already in the download archive.\n"
+        )
+
+    def format_failed_videos_warning(self):
+        failed_video_urls = self.store.failed_video_urls
+
+        return (
+            "Could not load "
+            + colored(
+                f"{len(failed_video_urls)} "
+                + ("videos" if len(failed_video_urls) > 1 else "video"),
+                fore=Colors.fore.MAGENTA,
+                style=Colors.style.BRIGHT,
+            )
+            + ". Skipping "
+            + ("them" if len(failed_video_urls) > 1 else "it")
+            + "...\n"
+            + "".join(f"   {video_url}\n" for video_url in failed_video_urls)
+        )
+
+    def format_failed_playlists_warning(self):
+        failed_playlist_urls = self.store.failed_playlist_urls
+
+        return (
+            "Could not load all videos of "
+            + colored(
+                f"{len(failed_playlist_urls)} "
+                + ("playlists" if len(failed_playlist_urls) > 1 else "playlist"),
+                fore=Colors.fore.MAGENTA,
+                style=Colors.style.BRIGHT,
+            )
+            + ". Skipping the rest of "
+            + ("them" if len(failed_playlist_urls) > 1 else "it")
+            + "...\n"
+            + "".join(f"   {playlist_url}\n" for playlist_url in failed_playlist_urls)
+        )
+
+    def format_failed_downloads_error(self):
+        failed_downloads = self.store.failed_downloads
+
+        return (
+            "Could not download "
+            + colored(
+                f"{len(failed_downloads)} "
+                + ("files" if len(failed_downloads) > 1 else "file"),
+                fore=Colors.fore.MAGENTA,
+                style=Colors.style.BRIGHT,
+            )
+            + ":\n"
+            + "".join(
+                f"   {video_title} "
+                + colored(formatted_definition, fore=Colors.fore.BLUE)
+                + f" {self.format_download_error(download_error)}\n"
+                for video_title, formatted_definition, download_error in failed_downloads
+            )
+            + "\n"
         )
 
+    def format_download_error(self, error: Exception):
+        # Failed commands would otherwise show all of their arguments
+        if isinstance(error, CalledProcessError):
+            error_message = f"Conversion failed (exit status {error.returncode})"
+        else:
+            error_message = (
+                getattr(error, "message", None) or str(error) or type(error).__name__
+            )
+
+        return colored(error_message.strip(), fore=Colors.fore.RED)
+
     def format_download_summary(self, video_index: int):
         skipped_formats_warning = self.format_skipped_formats_warning(video_index)
         fallback_replacement_summary = self.format_fallback_replacement_summary(
@@ -98,18 +177,21 @@ class DownloadCLIFormatter:
         return video_heading
 
     def format_video_length(self, video_index: int):
-        seconds_section = self.store.videos[video_index].length % 60
-        remaining_minutes = self.store.videos[video_index].length // 60
+        return self.format_duration(self.store.videos[video_index].length)
+
+    def format_duration(self, duration_in_seconds):
+        seconds_section = int(duration_in_seconds) % 60
+        remaining_minutes = int(duration_in_seconds) // 60
         minutes_section = remaining_minutes % 60
         hours_section = remaining_minutes // 60
 
-        formatted_video_length = (
+        formatted_duration = (
             (f"{hours_section}:" if hours_section > 0 else "")
             + f"{minutes_section:0>2}:"
             + f"{seconds_section:0>2}"
         )
 
-        return formatted_video_length
+        return formatted_duration
 
     def format_video_title(
         self, video_index: int, limit_of_characters: int = None
@@ -136,7 +218,12 @@ class DownloadCLIFormatter:
         current_download_progress = heading + "\n"
 
         if media_resource.download_status in DownloadStatusCodes.CONVERTING:
-            return current_download_progress + "\n"
+            conversion_progress_bar = self.format_conversion_progress_bar(video_index)
+
+            if conversion_progress_bar is None:
+                return current_download_progress + "\n"
+
+            return current_download_progress + "\n" + conversion_progress_bar + "\n\n"
         if media_resource.download_status == DownloadStatusCodes.DONE:
             return current_download_progress
 
@@ -146,6 +233,14 @@ class DownloadCLIFormatter:
 
         return current_download_progress
 
+    def format_failed_download_progress(self, video_index: int, error: Exception):
+        return (
+            self.format_download_progress_heading(video_index)
+            + "\n  "
+            + self.format_download_error(error)
+            + "\n\n"
+        )
+
     def format_download_progress_heading(self, video_index: int):
         media_resource = self.store.downloading_media_resources[video_index]
 
@@ -180,23 +275,68 @@ class DownloadCLIFormatter:
         )
 
         progress_percentage = bytes_downloaded / media_resource.total_size
-        available_width = min(screen.get_console_width(), self.store.MAX_SCREEN_WIDTH)
 
         formatted_bytes_downloaded = self.format_data_size(bytes_downloaded)
         formatted_total_size = self.format_data_size(media_resource.total_size)
 
+        return self.format_progress_bar(
+            status_color,
+            progress_percentage,
+            f"({formatted_bytes_downloaded} / " + f"{formatted_total_size})",
+            f"({formatted_total_size} / {formatted_total_size})",
+        )
+
+    def format_conversion_progress_bar(self, video_index: int):
+        media_resource = self.store.downloading_media_resources[video_index]
+        conversion_progress = media_resource.conversion_progress
+
+        if conversion_progress is None:
+            return None
+
+        progress_percentage = conversion_progress.get_percentage()
+        if progress_percentage is None:
+            return None
+
+        status_color = self.get_status_color(media_resource.download_status)
+
+        formatted_duration = self.format_duration(conversion_progress.duration)
+        formatted_speed = (
+            f", {conversion_progress.speed:.1f}x"
+            if conversion_progress.speed is not None
+            else ""
+        )
+        progress_details = (
+            f"({self.format_duration(conversion_progress.processed_duration)} / "
+            + f"{formatted_duration}{formatted_speed})"
+        )
+
+        return self.format_progress_bar(
+            status_color,
+            progress_percentage / 100,
+            progress_details,
+            max(
+                f"({formatted_duration} / {formatted_duration}, 00.0x)",
+                progress_details,
+                key=len,
+            ),
+        )
+
+    def format_progress_bar(
+        self,
+        status_color,
+        progress_percentage: float,
+        progress_details: str,
+        longest_progress_details: str,
+    ):
+        available_width = min(screen.get_console_width(), self.store.MAX_SCREEN_WIDTH)
+
         progress_bar_right = colored(
             f" {progress_percentage * 100:.1f}% ",
             fore=status_color,
             style=Colors.style.BRIGHT,
-        ) + colored(
-            f"({formatted_bytes_downloaded} / " + f"{formatted_total_size})",
-            style=Colors.style.DIM,
-        )
+        ) + colored(progress_details, style=Colors.style.DIM)
 
-        max_progress_bar_right_width = len(
-            f" 100.0% ({formatted_total_size} / {formatted_total_size})"
-        )
+        max_progress_bar_right_width = len(f" 100.0% {longest_progress_details}")
 
         available_space_for_loading_bar = (
             available_width - max_progress_bar_right_width - 2
@@ -243,7 +383,7 @@ class DownloadCLIFormatter:
     def format_download_formats(self):
         formatted_definitions = map(
             lambda media_resource: media_resource.formatted_definition,
-            self.store.media_resources_to_download,
+            self.store.media_resources_to_download.values(),
         )
         formatted_download_formats = " ".join(formatted_definitions)
         return formatted_download_formats
@@ -268,6 +408,9 @@ class DownloadCLIFormatter:
         if download_status == DownloadStatusCodes.DONE:
             return "✔"
 
+        if download_status == DownloadStatusCodes.FAILED:
+            return "✘"
+
         return ""
 
     def get_status_color(self, download_status: DownloadStatusCodes):
@@ -277,6 +420,8 @@ class DownloadCLIFormatter:
             return Colors.fore.CYAN
         if download_status == DownloadStatusCodes.DONE:
             return Colors.fore.GREEN
+        if download_status == DownloadStatusCodes.FAILED:
+            return Colors.fore.RED
 
         return ""
 
@@ -1,13 +1,17 @@
-from threading import Thread
+from threading import Lock, RLock, Thread
+from typing import Iterable
 from pytube import YouTube
 
 from mediakit.cli.screen import Content, ContentCategories, screen
 from mediakit.cli.loadble_cli_store import LoadableCLIStore
 from mediakit.media.download import DownloadStatusCodes, MediaResource
+from mediakit.utils.adaptive_concurrency import AdaptiveConcurrencyController
 
 
 class DownloadCLIStore(LoadableCLIStore):
     def __init__(self):
+        super().__init__()
+
         self.MAX_SCREEN_WIDTH = 80
         self.MAX_SHORT_VIDEO_TITLE_LENGTH = 26
 
@@ -17,69 +21,128 @@ class DownloadCLIStore(LoadableCLIStore):
         }
         self.DEFAULT_UI_UPDATE_INTERVAL = 0.2
         self.PROGRESS_UI_UPDATE_INTERVAL = self.DEFAULT_UI_UPDATE_INTERVAL
+        self.CONCURRENCY_TUNING_INTERVAL = 2.0
+        self.METADATA_PREFETCH_WINDOW_PER_WORKER = 2
+        self.UNFINISHED_VIDEOS_PER_DOWNLOAD_SLOT = 3
 
-        self.video_headings: "list[Content]" = []
-        self.ready_to_download_labels: "list[Content]" = []
-        self.download_confirmation_prompts: "list[Content]" = []
+        self.video_headings: "dict[int, Content]" = {}
+        self.ready_to_download_labels: "dict[int, Content]" = {}
+        self.download_confirmation_prompts: "dict[int, Content]" = {}
 
         self.output_path: str = None
         self.filename: str = None
 
-        self.videos: "list[YouTube]" = []
-
-        self.available_formats = []
-        self.media_resources_to_download: "list[MediaResource]" = []
-        self.skipped_formats = []
-        self.formats_replaced_by_fallback = []
-
-        self.downloading_media_resources: "list[MediaResource]" = []
-        self.download_progress_uis: "list[Content]" = []
-        self.rotating_line_frames: "list[int]" = []
-        self.loading_dots_frames: "list[int]" = []
+        self.video_urls_to_load: "Iterable[str]" = []
+        self.formats_to_load: "list[str]" = []
+        self.number_of_video_urls_read = 0
+        self.number_of_archived_videos = 0
+        self.has_read_all_video_urls = False
+        self.is_single_video_input = False
+
+        # Videos are indexed in the order they are registered, and released
+        # once their downloads end
+        self.videos: "dict[int, YouTube]" = {}
+        self.number_of_videos_registered = 0
+
+        self.available_formats = {}
+        self.media_resources_to_download: "dict[int, MediaResource]" = {}
+        self.skipped_formats = {}
+        self.formats_replaced_by_fallback = {}
+        self.download_archive_entries: "dict[int, list[tuple]]" = {}
+        self.failed_video_urls: "list[str]" = []
+        self.failed_playlist_urls: "list[str]" = []
+        self.failed_downloads: "list[tuple]" = []
+
+        self.downloading_media_resources: "dict[int, MediaResource]" = {}
+        self.download_progress_uis: "dict[int, Content]" = {}
+        self.rotating_line_frames: "dict[int, int]" = {}
+        self.loading_dots_frames: "dict[int, int]" = {}
 
         self.download_ui_update_thread: Thread = None
+        self.concurrency_controller: AdaptiveConcurrencyController = None
 
         self.is_terminated: bool = False
-
-    def prepare_store(self, number_of_videos: int):
-        self.videos = [None for _ in range(number_of_videos)]
-        self.available_formats = [
-            {"video": [], "audio": []} for _ in range(number_of_videos)
-        ]
-        self.media_resources_to_download = [None for _ in range(number_of_videos)]
-        self.skipped_formats = [[] for _ in range(number_of_videos)]
-        self.formats_replaced_by_fallback = [[] for _ in range(number_of_videos)]
-
-        self.downloading_media_resources = [None for _ in range(number_of_videos)]
-
-        self.video_headings = [None for _ in range(number_of_videos)]
-        self.ready_to_download_labels = [None for _ in range(number_of_videos)]
-        self.download_progress_uis = [None for _ in range(number_of_videos)]
-        self.download_confirmation_prompts: "list[Content]" = [
-            None for _ in range(number_of_videos)
-        ]
-
-        self.rotating_line_frames = [0 for _ in range(number_of_videos)]
-        self.loading_dots_frames = [0 for _ in range(number_of_videos)]
+        self.registration_lock = Lock()
+        self.progress_lock = RLock()
+
+    def register_video(
+        self,
+        video: YouTube,
+        media_resource: MediaResource,
+        available_formats,
+        skipped_formats,
+        formats_replaced_by_fallback,
+        download_archive_entries: "list[tuple]",
+    ):
+        with self.registration_lock:
+            video_index = self.number_of_videos_registered
+
+            self.available_formats[video_index] = available_formats
+            self.media_resources_to_download[video_index] = media_resource
+            self.skipped_formats[video_index] = skipped_formats
+            self.formats_replaced_by_fallback[
+                video_index
+            ] = formats_replaced_by_fallback
+            self.download_archive_entries[video_index] = download_archive_entries
+
+            self.rotating_line_frames[video_index] = 0
+            self.loading_dots_frames[video_index] = 0
+
+            self.videos[video_index] = video
+            self.number_of_videos_registered += 1
+
+            return video_index
+
+    def release_video(self, video_index: int):
+        for video_entries in [
+            self.videos,
+            self.available_formats,
+            self.media_resources_to_download,
+            self.skipped_formats,
+            self.formats_replaced_by_fallback,
+            self.download_archive_entries,
+            self.downloading_media_resources,
+            self.video_headings,
+            self.ready_to_download_labels,
+            self.download_confirmation_prompts,
+            self.download_progress_uis,
+            self.rotating_line_frames,
+            self.loading_dots_frames,
+        ]:
+            video_entries.pop(video_index, None)
 
     def reset(self):
         super().reset()
 
-        self.video_headings: "list[Content]" = []
-        self.ready_to_download_labels: "list[Content]" = []
-        self.download_confirmation_prompts: "list[Content]" = []
+        self.video_headings: "dict[int, Content]" = {}
+        self.ready_to_download_labels: "dict[int, Content]" = {}
+        self.download_confirmation_prompts: "dict[int, Content]" = {}
 
         self.output_path: str = None
         self.filename: str = None
 
-        self.videos: "list[YouTube]" = []
-
-        self.available_formats = []
-        self.media_resources_to_download: "list[MediaResource]" = []
-        self.skipped_formats = []
-        self.formats_replaced_by_fallback = []
-
-        self.downloading_media_resources: "list[MediaResource]" = []
-        self.download_progress_uis: "list[Content]" = []
-        self.rotating_line_frames: "list[int]" = []
-        self.loading_dots_frames: "list[int]" = []
+        self.video_urls_to_load: "Iterable[str]" = []
+        self.formats_to_load: "list[str]" = []
+        self.number_of_video_urls_read = 0
+        self.number_of_archived_videos = 0
+        self.has_read_all_video_urls = False
+        self.is_single_video_input = False
+
+        self.videos: "dict[int, YouTube]" = {}
+        self.number_of_videos_registered = 0
+
+        self.available_formats = {}
+        self.media_resources_to_download: "dict[int, MediaResource]" = {}
+        self.skipped_formats = {}
+        self.formats_replaced_by_fallback = {}
+        self.download_archive_entries: "dict[int, list[tuple]]" = {}
+        self.failed_video_urls: "list[str]" = []
+        self.failed_playlist_urls: "list[str]" = []
+        self.failed_downloads: "list[tuple]" = []
+
+        self.downloading_media_resources: "dict[int, MediaResource]" = {}
+        self.download_progress_uis: "dict[int, Content]" = {}
+        self.rotating_line_frames: "dict[int, int]" = {}
+        self.loading_dots_frames: "dict[int, int]" = {}
+
+        self.concurrency_controller: AdaptiveConcurrencyController = None
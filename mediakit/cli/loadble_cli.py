@@ -18,7 +18,9 @@ class LoadableCLI:
             self._remove_loading_label()
 
     def _show_loading_label(self, loading_label: str = "Loading video"):
-        self.store.loading_label = screen.append_content(
+        # The label is kept below the contents added while loading, so that
+        # animating it does not render all of them again
+        self.store.loading_label = screen.append_footer(
             f"\n{loading_label}.\n\n", ContentCategories.INFO
         )
 
@@ -1,5 +1,6 @@
 import sys
 from math import ceil
+from threading import RLock
 
 from clint.textui.cols import console_width
 
@@ -27,6 +28,7 @@ class ContentCategories:
 class Content:
     def __init__(self, index_on_screen, text, category):
         self.index_on_screen = index_on_screen
+        self.is_released = False
         self.update(text, category)
 
     def update(self, text: str = None, category: str = None):
@@ -79,16 +81,50 @@ class Content:
 class Screen:
     def __init__(self):
         self.contents = []
+        self.footer: Content = None
+
+        # Contents are added and updated from several download threads
+        self.lock = RLock()
 
     def append_content(self, content_text, category=ContentCategories.NORMAL):
-        index_on_screen = len(self.contents)
+        with self.lock:
+            if self.footer is not None:
+                return self._insert_content_before_footer(content_text, category)
 
-        new_content = Content(index_on_screen, content_text, category)
+            index_on_screen = len(self.contents)
 
-        self.contents.append(new_content)
-        self._render_content(new_content)
+            new_content = Content(index_on_screen, content_text, category)
 
-        return new_content
+            self.contents.append(new_content)
+            self._render_content(new_content)
+
+            return new_content
+
+    def append_footer(self, content_text, category=ContentCategories.NORMAL):
+        with self.lock:
+            footer = self.append_content(content_text, category)
+            self.footer = footer
+
+            return footer
+
+    def release_content(self, *contents: Content):
+        with self.lock:
+            for content in contents:
+                content.is_released = True
+
+            # Only the contents below an updated one are rendered again, so
+            # released contents can be forgotten once none above them changes
+            number_of_released_contents = 0
+            for content in self.contents:
+                if not content.is_released:
+                    break
+                number_of_released_contents += 1
+
+            if number_of_released_contents > 0:
+                del self.contents[:number_of_released_contents]
+
+                for index, content in enumerate(self.contents):
+                    content.index_on_screen = index
 
     def update_content(
         self,
@@ -96,25 +132,30 @@ class Screen:
         new_content_text: str,
         new_category: ContentCategories = None,
     ):
-        self._clear_lines_starting_at(content)
-        content.update(new_content_text, new_category)
-        self._render_contents_starting_at(content)
+        with self.lock:
+            self._clear_lines_starting_at(content)
+            content.update(new_content_text, new_category)
+            self._render_contents_starting_at(content)
 
     def remove_content(self, content):
-        index_to_remove_at = content.index_on_screen
+        with self.lock:
+            if content is self.footer:
+                self.footer = None
+
+            index_to_remove_at = content.index_on_screen
 
-        self._clear_lines_starting_at(content)
-        self.contents.pop(index_to_remove_at)
+            self._clear_lines_starting_at(content)
+            self.contents.pop(index_to_remove_at)
 
-        for index in range(index_to_remove_at, len(self.contents)):
-            self.contents[index].index_on_screen = index
+            for index in range(index_to_remove_at, len(self.contents)):
+                self.contents[index].index_on_screen = index
 
-        needs_to_rerender_contents = len(
-            self.contents
-        ) > 0 and index_to_remove_at < len(self.contents)
+            needs_to_rerender_contents = len(
+                self.contents
+            ) > 0 and index_to_remove_at < len(self.contents)
 
-        if needs_to_rerender_contents:
-            self._render_contents_starting_at(self.contents[index_to_remove_at])
+            if needs_to_rerender_contents:
+                self._render_contents_starting_at(self.contents[index_to_remove_at])
 
     def clear_lines(self, number_of_lines_to_clear):
         clear_expression = ANSIConsoleExpressions.MOVE_CURSOR_ONE_LINE_UP.join(
@@ -163,11 +204,25 @@ class Screen:
             self.erase_prompt_entry(prompt_message)
 
     def erase_prompt_entry(self, prompt):
-        lines_occupied_by_entry = 2  # <entry>\n<empty line> -> 2 lines to clear
-        self.clear_lines(lines_occupied_by_entry)
+        with self.lock:
+            lines_occupied_by_entry = 2  # <entry>\n<empty line> -> 2 lines to clear
+            self.clear_lines(lines_occupied_by_entry)
+
+            self._clear_lines_starting_at(prompt)
+            self._render_contents_starting_at(prompt)
+
+    def _insert_content_before_footer(self, content_text, category):
+        index_on_screen = self.footer.index_on_screen
+
+        self._clear_lines_starting_at(self.footer)
 
-        self._clear_lines_starting_at(prompt)
-        self._render_contents_starting_at(prompt)
+        new_content = Content(index_on_screen, content_text, category)
+        self.contents.insert(index_on_screen, new_content)
+        self.footer.index_on_screen += 1
+
+        self._render_contents_starting_at(new_content)
+
+        return new_content
 
     def _render_content(self, content):
         print(content.inner_text, end="", file=sys.stdout)
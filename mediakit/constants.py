@@ -5,6 +5,12 @@ FFMPEG_BINARY = get_ffmpeg_binary()
 
 DOWNLOAD_FORMATS = {"videoaudio", "audio", "videoonly"}
 
+
+class OutputContainers:
+    CONVERTED = "converted"
+    NATIVE = "native"
+
+
 VIDEO_DEFINITIONS = {
     "max": {"next": "2160p"},
     "2160p": {"next": "1440p"},
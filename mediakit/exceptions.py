@@ -116,3 +116,33 @@ class EmptyPlaylistException(MediakitException):
         category = ContentCategories.ERROR
 
         super().__init__(message, category)
+
+
+class RangeRequestsNotSupported(MediakitException):
+    def __init__(self):
+        message = (
+            "The server did not accept ranged requests. "
+            + "Falling back to a single connection...\n"
+        )
+        category = ContentCategories.WARNING
+
+        super().__init__(message, category)
+
+
+class DownloadInterrupted(MediakitException):
+    def __init__(self):
+        message = "The download was interrupted.\n\n"
+        category = ContentCategories.WARNING
+
+        super().__init__(message, category)
+
+
+class StreamIntegrityError(MediakitException):
+    def __init__(self):
+        message = (
+            "A downloaded file is incomplete or does not match its expected size. "
+            + "Please, try again.\n\n"
+        )
+        category = ContentCategories.ERROR
+
+        super().__init__(message, category)
@@ -1,3 +1,4 @@
+from os import path
 import sys
 
 
@@ -7,6 +8,27 @@ class GlobalConfig:
         self.ui_colors_disabled = not sys.stdin.isatty()
         self.batch_file = None
         self.max_downloads_in_parallel = 2
+        self.adaptive_downloads_in_parallel = False
+        self.max_conversions_in_parallel = 2
+        self.conversion_threads = None
+        self.conversion_niceness = None
+        self.conversion_idle_io_priority = False
+        self.max_metadata_loads_in_parallel = 8
+        self.connections_per_download = 1
+        self.resume_downloads = False
+        self.stream_conversion = False
+        self.rate_limit = None
+        self.rate_limit_per_download = None
+        self.connection_pool_size = 16
+        self.socket_buffer_size = None
+        self.chunk_size = None
+        self.data_directory = path.join(path.expanduser("~"), ".mediakit")
+        self.cache_directory = None
+        self.cache_max_size = 10 * 1024 * 1024 * 1024
+        self.cache_manifests = False
+        self.manifest_cache_ttl = 6 * 60 * 60
+        self.download_archive = None
+        self.output_container = "converted"
 
 
 global_config = GlobalConfig()
@@ -1,6 +1,15 @@
 from .actions.main import get_command_actions
+from .utils.connection_pool import install_connection_pool, close_connection_pool
 
 
 def main():
-    for action in get_command_actions():
-        action()
+    install_connection_pool()
+    exit_code = 0
+
+    try:
+        for action in get_command_actions():
+            exit_code = action() or exit_code
+    finally:
+        close_connection_pool()
+
+    return exit_code
@@ -0,0 +1,153 @@
+from os import makedirs, path
+from threading import Lock
+import os
+import uuid
+
+from mediakit.globals import global_config
+from mediakit.media.integrity import verify_stream_file
+from mediakit.utils.files import link_or_copy_file
+
+
+CACHE_ENTRY_EXTENSION = "stream"
+DIGEST_EXTENSION = "sha256"
+PARTIAL_ENTRY_EXTENSION = "partial"
+
+
+class MediaCache:
+    def __init__(self, directory: str, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        self.lock = Lock()
+
+    def get_entry_path(self, video_id: str, itag: int, size: int):
+        return path.join(
+            self.directory, f"{video_id}-{itag}-{size}.{CACHE_ENTRY_EXTENSION}"
+        )
+
+    def contains(self, video_id: str, itag: int, size: int):
+        entry_path = self.get_entry_path(video_id, itag, size)
+        return path.isfile(entry_path) and path.getsize(entry_path) == size
+
+    def restore(self, video_id: str, itag: int, size: int, file_path: str):
+        entry_path = self.get_entry_path(video_id, itag, size)
+
+        try:
+            expected_digest = self._read_digest(entry_path)
+            if expected_digest is None or not verify_stream_file(
+                entry_path, size, expected_digest
+            ):
+                self._remove_entry(entry_path)
+                return False
+
+            # Touching the entry marks it as recently used for the eviction
+            os.utime(entry_path)
+
+            if path.lexists(file_path):
+                os.unlink(file_path)
+            link_or_copy_file(entry_path, file_path)
+            return True
+        except OSError:
+            return False
+
+    def store(self, video_id: str, itag: int, size: int, file_path: str, digest: str):
+        if size > self.max_size:
+            return
+
+        entry_path = self.get_entry_path(video_id, itag, size)
+        partial_entry_path = (
+            f"{entry_path}.{uuid.uuid4().hex}.{PARTIAL_ENTRY_EXTENSION}"
+        )
+        partial_digest_path = f"{partial_entry_path}.{DIGEST_EXTENSION}"
+
+        # The digest is kept next to its entry, so it is evicted along with it
+        try:
+            makedirs(self.directory, exist_ok=True)
+
+            with open(partial_digest_path, "w", encoding="utf-8") as digest_file:
+                digest_file.write(digest)
+            os.replace(partial_digest_path, self._get_digest_path(entry_path))
+
+            link_or_copy_file(file_path, partial_entry_path)
+            os.replace(partial_entry_path, entry_path)
+        except OSError:
+            self._remove_file(partial_digest_path)
+            self._remove_file(partial_entry_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            entries = self._get_entries()
+            total_size = sum(entry_size for _, entry_size, _ in entries)
+
+            entries.sort(key=lambda entry: entry[2])
+            for entry_path, entry_size, _ in entries:
+                if total_size <= self.max_size:
+                    break
+
+                total_size -= entry_size
+                self._remove_entry(entry_path)
+
+    def _get_entries(self) -> "list[tuple]":
+        entries = []
+
+        try:
+            with os.scandir(self.directory) as directory_entries:
+                for entry in directory_entries:
+                    if not entry.name.endswith(f".{CACHE_ENTRY_EXTENSION}"):
+                        continue
+
+                    try:
+                        entry_stat = entry.stat()
+                    except OSError:
+                        continue
+
+                    entries.append(
+                        (entry.path, entry_stat.st_size, entry_stat.st_mtime)
+                    )
+        except OSError:
+            pass
+
+        return entries
+
+    def _get_digest_path(self, entry_path: str):
+        return f"{entry_path}.{DIGEST_EXTENSION}"
+
+    def _read_digest(self, entry_path: str):
+        try:
+            with open(
+                self._get_digest_path(entry_path), "r", encoding="utf-8"
+            ) as digest_file:
+                return digest_file.read().strip() or None
+        except OSError:
+            return None
+
+    def _remove_entry(self, entry_path: str):
+        self._remove_file(entry_path)
+        self._remove_file(self._get_digest_path(entry_path))
+
+    def _remove_file(self, file_path: str):
+        try:
+            os.unlink(file_path)
+        except OSError:
+            pass
+
+
+_media_cache: MediaCache = None
+_media_cache_lock = Lock()
+
+
+def get_media_cache():
+    global _media_cache
+
+    if global_config.cache_directory is None:
+        return None
+
+    with _media_cache_lock:
+        if _media_cache is None:
+            _media_cache = MediaCache(
+                global_config.cache_directory, global_config.cache_max_size
+            )
+
+        return _media_cache
@@ -0,0 +1,73 @@
+from threading import BoundedSemaphore, Lock
+import os
+
+from mediakit.globals import global_config
+from mediakit.utils.commands import is_command_available
+
+
+IDLE_IO_PRIORITY_CLASS = "3"
+
+
+def get_number_of_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return max(len(os.sched_getaffinity(0)), 1)
+
+    return os.cpu_count() or 1
+
+
+class ConversionScheduler:
+    def __init__(
+        self,
+        max_processes: int,
+        threads_per_process: int = None,
+        niceness: int = None,
+        idle_io_priority: bool = False,
+    ):
+        self.max_processes = max(max_processes, 1)
+        # Cores are split evenly, so that running every process at once keeps
+        # all of them busy without oversubscribing them
+        self.threads_per_process = threads_per_process or max(
+            get_number_of_cores() // self.max_processes, 1
+        )
+        self.niceness = niceness
+        self.idle_io_priority = idle_io_priority
+
+        self.process_slots = BoundedSemaphore(self.max_processes)
+
+    def acquire_process_slot(self):
+        self.process_slots.acquire()
+
+    def release_process_slot(self):
+        self.process_slots.release()
+
+    def get_thread_options(self):
+        return ["-threads", str(self.threads_per_process)]
+
+    def get_command_prefix(self):
+        command_prefix = []
+
+        if self.niceness is not None and is_command_available("nice"):
+            command_prefix += ["nice", "-n", str(self.niceness)]
+        if self.idle_io_priority and is_command_available("ionice"):
+            command_prefix += ["ionice", "-c", IDLE_IO_PRIORITY_CLASS]
+
+        return command_prefix
+
+
+_conversion_scheduler: ConversionScheduler = None
+_conversion_scheduler_lock = Lock()
+
+
+def get_conversion_scheduler():
+    global _conversion_scheduler
+
+    with _conversion_scheduler_lock:
+        if _conversion_scheduler is None:
+            _conversion_scheduler = ConversionScheduler(
+                global_config.max_conversions_in_parallel,
+                threads_per_process=global_config.conversion_threads,
+                niceness=global_config.conversion_niceness,
+                idle_io_priority=global_config.conversion_idle_io_priority,
+            )
+
+        return _conversion_scheduler
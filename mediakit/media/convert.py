@@ -1,40 +1,203 @@
-from os import path
+from threading import Lock, Thread
+from time import monotonic
+import subprocess
 
 from mediakit.utils.files import increment_filename_if_exists
-from mediakit.utils.commands import run_command_in_background
+from mediakit.utils.commands import start_process, wait_for_command
+from mediakit.media.conversion_scheduler import get_conversion_scheduler
 from mediakit.constants import FFMPEG_BINARY
 
 
-VIDEO_FORMATS = {"mp4"}
+VIDEO_FORMATS = {"mp4", "webm", "matroska"}
+NATIVE_CONTAINER_FORMATS = {"m4a": "mp4", "mkv": "matroska"}
+PIPED_INPUT = "pipe:0"
+PROGRESS_OPTIONS = ["-progress", "pipe:1", "-nostats", "-loglevel", "error"]
 
 
 class ConversionOptions:
     NO_AUDIO = "-an"
+    COPY_STREAMS = ("-c", "copy")
+
+
+class ConversionProgress:
+    def __init__(self, duration: float = None):
+        self.duration = duration
+        self.processed_duration = 0.0
+        self.speed: float = None
+
+        self.started_at = monotonic()
+        self.finished_at: float = None
+
+        self.lock = Lock()
+
+    def update(self, progress_fields: "dict[str, str]"):
+        processed_microseconds = progress_fields.get(
+            "out_time_us", progress_fields.get("out_time_ms")
+        )
+        speed = progress_fields.get("speed", "").rstrip("x")
+
+        with self.lock:
+            try:
+                self.processed_duration = max(int(processed_microseconds) / 1e6, 0)
+            except (TypeError, ValueError):
+                pass
+
+            try:
+                self.speed = float(speed)
+            except ValueError:
+                pass
+
+            if progress_fields.get("progress") == "end":
+                self.finished_at = monotonic()
+
+    def get_percentage(self):
+        if not self.duration:
+            return None
+
+        with self.lock:
+            return min(self.processed_duration / self.duration, 1.0) * 100
+
+    def get_elapsed_time(self):
+        finished_at = self.finished_at if self.finished_at is not None else monotonic()
+        return finished_at - self.started_at
 
 
 def merge_video_and_audio(
-    video_path, audio_path, output_file_path, output_format="mp4"
+    video_path,
+    audio_path,
+    output_file_path,
+    output_format="mp4",
+    options=[],
+    progress: ConversionProgress = None,
 ):
     final_output_file_path = increment_filename_if_exists(output_file_path)
 
-    command = (
-        f'{FFMPEG_BINARY} -i "{video_path}" -i "{audio_path}" '
-        f"-vcodec copy -f {output_format} "
-        f'"{final_output_file_path}"'
+    arguments = _get_merge_arguments(
+        video_path, audio_path, final_output_file_path, output_format, options
     )
 
-    run_command_in_background(command)
+    wait_for_command(_start_ffmpeg(arguments, progress, stdin=subprocess.DEVNULL))
 
 
-def convert_media(file_path, output_file_path, output_format, options=[]):
+def convert_media(
+    file_path,
+    output_file_path,
+    output_format,
+    options=[],
+    progress: ConversionProgress = None,
+):
+    final_output_file_path = increment_filename_if_exists(output_file_path)
+
+    arguments = _get_conversion_arguments(
+        file_path, final_output_file_path, output_format, options
+    )
+
+    wait_for_command(_start_ffmpeg(arguments, progress, stdin=subprocess.DEVNULL))
+
+
+def start_piped_merge(
+    video_fifo_path,
+    audio_fifo_path,
+    output_file_path,
+    output_format="mp4",
+    options=[],
+    progress: ConversionProgress = None,
+) -> subprocess.Popen:
     final_output_file_path = increment_filename_if_exists(output_file_path)
 
-    command = (
-        f'{FFMPEG_BINARY} -i "{file_path}" '
-        + ("-vcodec copy " if output_format in VIDEO_FORMATS else "")
-        + f"-f {output_format} "
-        + f'"{final_output_file_path}" '
-        + " ".join(options)
+    arguments = _get_merge_arguments(
+        video_fifo_path, audio_fifo_path, final_output_file_path, output_format, options
     )
 
-    run_command_in_background(command)
+    return _start_ffmpeg(arguments, progress, stdin=subprocess.DEVNULL)
+
+
+def start_piped_conversion(
+    output_file_path,
+    output_format,
+    options=[],
+    progress: ConversionProgress = None,
+) -> subprocess.Popen:
+    final_output_file_path = increment_filename_if_exists(output_file_path)
+
+    arguments = _get_conversion_arguments(
+        PIPED_INPUT, final_output_file_path, output_format, options
+    )
+
+    return _start_ffmpeg(arguments, progress, stdin=subprocess.PIPE)
+
+
+def _start_ffmpeg(arguments, progress: ConversionProgress, stdin):
+    conversion_scheduler = get_conversion_scheduler()
+
+    # Each process holds a slot until it exits, including piped conversions
+    # that run while their streams are being downloaded
+    conversion_scheduler.acquire_process_slot()
+
+    try:
+        process = start_process(
+            conversion_scheduler.get_command_prefix()
+            + [FFMPEG_BINARY, *PROGRESS_OPTIONS, *arguments],
+            stdin=stdin,
+            stdout=subprocess.PIPE,
+        )
+    except Exception as error:
+        conversion_scheduler.release_process_slot()
+        raise error
+
+    # The progress must always be read, otherwise FFmpeg blocks once the pipe
+    # is full
+    Thread(
+        target=_read_progress,
+        args=(process, progress or ConversionProgress()),
+        daemon=True,
+    ).start()
+
+    return process
+
+
+def _read_progress(process: subprocess.Popen, progress: ConversionProgress):
+    progress_fields = {}
+
+    try:
+        with process.stdout as progress_output:
+            for line in progress_output:
+                key, _, value = line.decode("utf-8", "replace").strip().partition("=")
+                progress_fields[key] = value
+
+                # Each block of progress fields ends with its progress state
+                if key == "progress":
+                    progress.update(progress_fields)
+                    progress_fields = {}
+
+        process.wait()
+    finally:
+        get_conversion_scheduler().release_process_slot()
+
+
+def _get_merge_arguments(
+    video_path, audio_path, output_file_path, output_format, options
+):
+    return [
+        "-i",
+        video_path,
+        "-i",
+        audio_path,
+        "-vcodec",
+        "copy",
+        *options,
+        *get_conversion_scheduler().get_thread_options(),
+        "-f",
+        output_format,
+        output_file_path,
+    ]
+
+
+def _get_conversion_arguments(file_path, output_file_path, output_format, options):
+    return (
+        ["-i", file_path]
+        + (["-vcodec", "copy"] if output_format in VIDEO_FORMATS else [])
+        + options
+        + get_conversion_scheduler().get_thread_options()
+        + ["-f", output_format, output_file_path]
+    )
@@ -1,16 +1,44 @@
+from functools import partial
 from os import path
+from threading import Thread
+import hashlib
 import uuid
 
-from pytube.__main__ import YouTube
+from pytube import Stream
 
-from mediakit import info
+from mediakit import exceptions, info
 from mediakit.media.convert import (
     merge_video_and_audio,
     convert_media,
+    start_piped_merge,
+    start_piped_conversion,
     ConversionOptions,
+    ConversionProgress,
+    NATIVE_CONTAINER_FORMATS,
 )
-from mediakit.utils.files import get_safe_filename, remove_file, move_file
-from mediakit.constants import VIDEO_DEFINITIONS_ALIASES
+from mediakit.media.cache import get_media_cache
+from mediakit.media.download_manifest import DownloadManifest
+from mediakit.media.segmented_download import download_stream, pipe_stream
+from mediakit.media.shared_download import SharedStreamDownload
+from mediakit.media.stream_index import StreamIndex
+from mediakit.utils.commands import wait_for_command
+from mediakit.utils.rate_limit import RateLimiter, get_rate_limiters_for_download
+from mediakit.utils.files import (
+    get_safe_filename,
+    increment_filename_if_exists,
+    link_or_copy_file,
+    remove_file,
+    move_file,
+    create_fifo,
+    supports_fifos,
+    open_fifo_for_writing,
+)
+from mediakit.constants import VIDEO_DEFINITIONS_ALIASES, OutputContainers
+from mediakit.globals import global_config
+
+
+NATIVE_AUDIO_EXTENSIONS = {"mp4": "m4a"}
+MIXED_CONTAINERS_EXTENSION = "mkv"
 
 
 class DownloadStatusCodes:
@@ -18,6 +46,7 @@ class DownloadStatusCodes:
     DOWNLOADING = "DOWNLOADING"
     CONVERTING = "CONVERTING"
     DONE = "DONE"
+    FAILED = "FAILED"
 
 
 class MediaResource:
@@ -29,8 +58,12 @@ class MediaResource:
         definition="max",
         filename="",
         filename_suffix="",
+        stream_index: StreamIndex = None,
     ):
         self.source = source
+        self.stream_index = (
+            stream_index if stream_index is not None else StreamIndex(source.streams)
+        )
         self.output_type = output_type
         self.output_path = output_path
         self.definition = definition
@@ -42,7 +75,31 @@ class MediaResource:
         )
         is_alias_definition = definition != final_definition
 
-        default_extension = "mp4" if self.output_type.startswith("video") else "mp3"
+        if output_type.startswith("video"):
+            self.video = self._get_video_stream(final_definition)
+            self.total_size = self.video.filesize
+            self.video_bytes_remaining = self.video.filesize
+
+            if output_type == "videoaudio":
+                if self._is_audio_included():
+                    self.has_external_audio = False
+                else:
+                    self._include_external_audio()
+                    self.has_external_audio = True
+
+        elif output_type == "audio":
+            self.audio = self._get_audio_stream(final_definition)
+            self.total_size = self.audio.filesize
+            self.audio_bytes_remaining = self.audio.filesize
+
+        if global_config.output_container == OutputContainers.NATIVE:
+            default_extension = self._get_native_extension()
+            self.output_format = NATIVE_CONTAINER_FORMATS.get(
+                default_extension, default_extension
+            )
+        else:
+            default_extension = "mp4" if self.output_type.startswith("video") else "mp3"
+            self.output_format = default_extension
 
         if filename:
             *initial_filename_components, last_filename_component = filename.split(".")
@@ -68,23 +125,6 @@ class MediaResource:
                 f"{filename_without_extension}.{default_extension}"
             )
 
-        if output_type.startswith("video"):
-            self.video = self._get_video_stream(final_definition)
-            self.total_size = self.video.filesize
-            self.video_bytes_remaining = self.video.filesize
-
-            if output_type == "videoaudio":
-                if self._is_audio_included():
-                    self.has_external_audio = False
-                else:
-                    self._include_external_audio()
-                    self.has_external_audio = True
-
-        elif output_type == "audio":
-            self.audio = self._get_audio_stream(final_definition)
-            self.total_size = self.audio.filesize
-            self.audio_bytes_remaining = self.audio.filesize
-
         self.formatted_definition = (
             f"[{output_type} " if output_type != "videoaudio" else "["
         )
@@ -101,42 +141,91 @@ class MediaResource:
             self.formatted_definition += f"{final_definition}]"
 
         self.download_status = DownloadStatusCodes.READY
-        self.downloading_stream = None
-
-        unique_resource_id = uuid.uuid4()
-        self.temporary_video_filename = (
-            f"{info.temporary_filename}-{unique_resource_id}[video].webm"
-        )
-        self.temporary_audio_filename = (
-            f"{info.temporary_filename}-{unique_resource_id}[audio].webm"
-        )
+        self.was_converted_while_downloading = False
+        self.conversion_progress: ConversionProgress = None
+        self.rate_limiters: "list[RateLimiter]" = []
+        self.shared_downloads: "dict[str, SharedStreamDownload]" = {}
+
+        if global_config.resume_downloads:
+            self.temporary_video_filename = self._get_resumable_temporary_filename(
+                "video"
+            )
+            self.temporary_audio_filename = self._get_resumable_temporary_filename(
+                "audio"
+            )
+        else:
+            unique_resource_id = uuid.uuid4()
+            self.temporary_video_filename = (
+                f"{info.temporary_filename}-{unique_resource_id}[video].webm"
+            )
+            self.temporary_audio_filename = (
+                f"{info.temporary_filename}-{unique_resource_id}[audio].webm"
+            )
 
-    def download(self):
+    def download_streams(self):
         self.download_status = DownloadStatusCodes.DOWNLOADING
+        self.rate_limiters = get_rate_limiters_for_download()
 
-        if self.output_type.startswith("video"):
-            self.downloading_stream = self.video
+        if self._can_stream_into_conversion():
+            self._download_and_convert_piped_streams()
+            self.was_converted_while_downloading = True
+            return
 
-            self.video.download(
-                output_path=self.output_path,
-                filename=self.temporary_video_filename,
-                skip_existing=False,
-            )
-        if self.output_type == "audio" or (
-            self.output_type == "videoaudio" and self.has_external_audio
-        ):
-            self.downloading_stream = self.audio
+        streams_to_download = [
+            (stream, self.get_temporary_filename(stream_type))
+            for stream_type, stream in self.get_streams_to_download()
+        ]
 
-            self.audio.download(
-                output_path=self.output_path,
-                filename=self.temporary_audio_filename,
-                skip_existing=False,
-            )
+        self._download_streams_concurrently(streams_to_download)
 
         self.download_status = DownloadStatusCodes.CONVERTING
-        self._convert_dowloaded_resources()
+
+    def convert(self):
+        self.download_status = DownloadStatusCodes.CONVERTING
+
+        if not self.was_converted_while_downloading:
+            self._convert_dowloaded_resources()
+
         self.download_status = DownloadStatusCodes.DONE
 
+    def get_streams_to_download(self) -> "list[tuple]":
+        streams_to_download = []
+
+        if self.output_type.startswith("video"):
+            streams_to_download.append(("video", self.video))
+        if self._needs_audio_stream():
+            streams_to_download.append(("audio", self.audio))
+
+        return streams_to_download
+
+    def get_temporary_filename(self, stream_type: str):
+        return getattr(self, f"temporary_{stream_type}_filename")
+
+    def share_stream_download(
+        self, stream_type: str, stream: Stream, shared_download: SharedStreamDownload
+    ):
+        setattr(
+            self,
+            f"temporary_{stream_type}_filename",
+            shared_download.temporary_filename,
+        )
+        self.shared_downloads[stream_type] = shared_download
+        shared_download.subscribe(self, stream)
+
+    def update_bytes_remaining(self, stream: Stream, bytes_remaining: int):
+        shared_download = self._get_shared_download(stream)
+
+        if shared_download is not None:
+            shared_download.report_bytes_remaining(bytes_remaining)
+        else:
+            self.set_bytes_remaining(stream, bytes_remaining)
+
+    def set_bytes_remaining(self, stream: Stream, bytes_remaining: int):
+        if self.output_type.startswith("video") and stream is self.video:
+            self.video_bytes_remaining = bytes_remaining
+        elif stream is getattr(self, "audio", None):
+            self.audio_bytes_remaining = bytes_remaining
+
     def get_total_bytes_remaining(self):
         if self.output_type == "videoaudio":
             if self.has_external_audio:
@@ -150,18 +239,253 @@ class MediaResource:
         if self.output_type == "audio":
             return self.audio_bytes_remaining
 
-    def copy(self, source: YouTube = None):
-        final_source = source if source is not None else self.source
+    def _download_streams_concurrently(
+        self, streams_to_download: "list[tuple]", download_function=None
+    ):
+        download_errors: "list[Exception]" = []
+
+        def download_to_temporary_file(stream: Stream, temporary_filename: str):
+            shared_download = self._get_shared_download(stream)
+
+            if shared_download is not None:
+                shared_download.run(
+                    partial(download_stream_once, stream, temporary_filename)
+                )
+            else:
+                download_stream_once(stream, temporary_filename)
+
+        def download_stream_once(stream: Stream, temporary_filename: str):
+            if self._restore_from_cache(stream, temporary_filename):
+                return
+
+            try:
+                digest = download_stream(
+                    stream,
+                    self.output_path,
+                    temporary_filename,
+                    global_config.connections_per_download,
+                    resumable=global_config.resume_downloads,
+                    rate_limiters=self.rate_limiters,
+                )
+            except exceptions.StreamIntegrityError:
+                # Corrupted partial files must not be resumed, so start over once
+                temporary_file_path = path.join(self.output_path, temporary_filename)
+                remove_file(temporary_file_path)
+                DownloadManifest(temporary_file_path, stream.filesize).remove()
+
+                self.update_bytes_remaining(stream, stream.filesize)
+                digest = download_stream(
+                    stream,
+                    self.output_path,
+                    temporary_filename,
+                    global_config.connections_per_download,
+                    resumable=global_config.resume_downloads,
+                    rate_limiters=self.rate_limiters,
+                )
+
+            # Files completed by a previous run report no progress of their own
+            self.update_bytes_remaining(stream, 0)
+            self._store_in_cache(stream, temporary_filename, digest)
+
+        final_download_function = download_function or download_to_temporary_file
+
+        def download(stream: Stream, destination: str):
+            try:
+                final_download_function(stream, destination)
+            except Exception as error:
+                download_errors.append(error)
+
+        download_threads = [
+            Thread(target=partial(download, stream, destination))
+            for stream, destination in streams_to_download
+        ]
+
+        for thread in download_threads:
+            thread.start()
+        for thread in download_threads:
+            thread.join()
+
+        if len(download_errors) > 0:
+            raise download_errors[0]
+
+    def _get_shared_download(self, stream: Stream) -> SharedStreamDownload:
+        for stream_type, shared_stream in self.get_streams_to_download():
+            if stream is shared_stream:
+                return self.shared_downloads.get(stream_type)
 
-        return MediaResource(
-            final_source,
-            self.output_type,
-            output_path=self.output_path,
-            definition=self.definition,
-            filename=self.filename,
+        return None
+
+    def _remove_temporary_file(self, stream: Stream, file_path: str):
+        shared_download = self._get_shared_download(stream)
+
+        # Shared files are only removed after their last conversion
+        if shared_download is None or shared_download.release():
+            remove_file(file_path)
+            DownloadManifest(file_path, stream.filesize).remove()
+
+    def _restore_from_cache(self, stream: Stream, temporary_filename: str):
+        media_cache = get_media_cache()
+        if media_cache is None:
+            return False
+
+        was_restored = media_cache.restore(
+            self.source.video_id,
+            stream.itag,
+            stream.filesize,
+            path.join(self.output_path, temporary_filename),
+        )
+        if was_restored:
+            self.update_bytes_remaining(stream, 0)
+
+        return was_restored
+
+    def _store_in_cache(self, stream: Stream, temporary_filename: str, digest: str):
+        media_cache = get_media_cache()
+        if media_cache is None:
+            return
+
+        media_cache.store(
+            self.source.video_id,
+            stream.itag,
+            stream.filesize,
+            path.join(self.output_path, temporary_filename),
+            digest,
+        )
+
+    def _is_cached(self, stream: Stream):
+        media_cache = get_media_cache()
+
+        return media_cache is not None and media_cache.contains(
+            self.source.video_id, stream.itag, stream.filesize
+        )
+
+    def _needs_audio_stream(self):
+        return self.output_type == "audio" or (
+            self.output_type == "videoaudio" and self.has_external_audio
         )
 
+    def _can_stream_into_conversion(self):
+        if not global_config.stream_conversion or global_config.resume_downloads:
+            return False
+
+        # Streams kept as they are would only be copied by FFmpeg, so they are
+        # downloaded straight to their file instead
+        if self._can_keep_downloaded_stream():
+            return False
+
+        streams = []
+        if self.output_type.startswith("video"):
+            streams.append(self.video)
+        if self._needs_audio_stream():
+            streams.append(self.audio)
+
+        if len(streams) > 1 and not supports_fifos():
+            return False
+
+        # A stream shared with other resources must be kept in a file
+        if len(self.shared_downloads) > 0:
+            return False
+
+        # Cached streams are restored from disk instead of being downloaded
+        if any(self._is_cached(stream) for stream in streams):
+            return False
+
+        return all(self._supports_piped_input(stream) for stream in streams)
+
+    def _supports_piped_input(self, stream: Stream):
+        if getattr(stream, "is_otf", False):
+            return False
+
+        # Progressive mp4 files may keep their index at the end of the file,
+        # which FFmpeg can only reach with a seekable input
+        return stream.subtype == "webm" or (
+            stream.subtype == "mp4" and stream.is_adaptive
+        )
+
+    def _download_and_convert_piped_streams(self):
+        output_file_path = path.join(self.output_path, self.filename)
+
+        if self.output_type == "videoaudio" and self.has_external_audio:
+            self._download_and_merge_through_fifos(output_file_path)
+            return
+
+        if self.output_type.startswith("video"):
+            stream = self.video
+            options = (
+                [ConversionOptions.NO_AUDIO] if self.output_type == "videoonly" else []
+            )
+        else:
+            stream = self.audio
+            options = []
+
+        self.conversion_progress = ConversionProgress(self.source.length)
+        conversion_process = start_piped_conversion(
+            output_file_path,
+            self.output_format,
+            options=options + self._get_container_options(),
+            progress=self.conversion_progress,
+        )
+
+        try:
+            with conversion_process.stdin as conversion_input:
+                pipe_stream(stream, conversion_input, self.rate_limiters)
+        except Exception as error:
+            conversion_process.kill()
+            raise error
+
+        self.download_status = DownloadStatusCodes.CONVERTING
+        wait_for_command(conversion_process)
+
+    def _download_and_merge_through_fifos(self, output_file_path: str):
+        video_fifo_path = path.join(
+            self.output_path, f"{self.temporary_video_filename}.fifo"
+        )
+        audio_fifo_path = path.join(
+            self.output_path, f"{self.temporary_audio_filename}.fifo"
+        )
+
+        create_fifo(video_fifo_path)
+        create_fifo(audio_fifo_path)
+
+        self.conversion_progress = ConversionProgress(self.source.length)
+        merge_process = start_piped_merge(
+            video_fifo_path,
+            audio_fifo_path,
+            output_file_path,
+            output_format=self.output_format,
+            options=self._get_container_options(),
+            progress=self.conversion_progress,
+        )
+
+        def is_merge_process_alive():
+            return merge_process.poll() is None
+
+        def pipe_to_fifo(stream: Stream, fifo_path: str):
+            with open_fifo_for_writing(fifo_path, is_merge_process_alive) as fifo:
+                pipe_stream(stream, fifo, self.rate_limiters)
+
+        try:
+            self._download_streams_concurrently(
+                [(self.video, video_fifo_path), (self.audio, audio_fifo_path)],
+                download_function=pipe_to_fifo,
+            )
+        except Exception as error:
+            merge_process.kill()
+            raise error
+        finally:
+            remove_file(video_fifo_path)
+            remove_file(audio_fifo_path)
+
+        self.download_status = DownloadStatusCodes.CONVERTING
+        wait_for_command(merge_process)
+
     def _convert_dowloaded_resources(self):
+        if self._can_keep_downloaded_stream():
+            self._keep_downloaded_stream()
+            return
+
+        self.conversion_progress = ConversionProgress(self.source.length)
+
         if self.output_type.startswith("video"):
             if self.output_type == "videoaudio" and self.has_external_audio:
                 self._merge_video_with_external_audio()
@@ -175,10 +499,17 @@ class MediaResource:
         audio_path = path.join(self.output_path, self.temporary_audio_filename)
         output_file_path = path.join(self.output_path, self.filename)
 
-        merge_video_and_audio(video_path, audio_path, output_file_path)
+        merge_video_and_audio(
+            video_path,
+            audio_path,
+            output_file_path,
+            output_format=self.output_format,
+            options=self._get_container_options(),
+            progress=self.conversion_progress,
+        )
 
-        remove_file(video_path)
-        remove_file(audio_path)
+        self._remove_temporary_file(self.video, video_path)
+        self._remove_temporary_file(self.audio, audio_path)
 
     def _convert_downloaded_video(self):
         downloaded_temp_file_path = path.join(
@@ -191,9 +522,13 @@ class MediaResource:
             options.append(ConversionOptions.NO_AUDIO)
 
         convert_media(
-            downloaded_temp_file_path, output_file_path, "mp4", options=options
+            downloaded_temp_file_path,
+            output_file_path,
+            self.output_format,
+            options=options + self._get_container_options(),
+            progress=self.conversion_progress,
         )
-        remove_file(downloaded_temp_file_path)
+        self._remove_temporary_file(self.video, downloaded_temp_file_path)
 
     def _convert_downloaded_audio(self):
         downloaded_temp_filename = self.temporary_audio_filename
@@ -203,31 +538,90 @@ class MediaResource:
         )
         output_file_path = path.join(self.output_path, self.filename)
 
-        convert_media(downloaded_temp_file_path, output_file_path, "mp3")
-        remove_file(downloaded_temp_file_path)
+        convert_media(
+            downloaded_temp_file_path,
+            output_file_path,
+            self.output_format,
+            options=self._get_container_options(),
+            progress=self.conversion_progress,
+        )
+        self._remove_temporary_file(self.audio, downloaded_temp_file_path)
+
+    def _keep_downloaded_stream(self):
+        stream_type, stream = self.get_streams_to_download()[0]
+
+        downloaded_temp_file_path = path.join(
+            self.output_path, self.get_temporary_filename(stream_type)
+        )
+        output_file_path = increment_filename_if_exists(
+            path.join(self.output_path, self.filename)
+        )
+
+        shared_download = self._get_shared_download(stream)
+
+        # Shared files are still needed by other resources until their last one
+        if shared_download is None or shared_download.release():
+            move_file(downloaded_temp_file_path, output_file_path)
+            DownloadManifest(downloaded_temp_file_path, stream.filesize).remove()
+        else:
+            link_or_copy_file(downloaded_temp_file_path, output_file_path)
+
+    def _is_native_container(self):
+        return global_config.output_container == OutputContainers.NATIVE
+
+    def _can_keep_downloaded_stream(self):
+        if not self._is_native_container():
+            return False
+
+        if self.output_type == "videoaudio":
+            return not self.has_external_audio
+        if self.output_type == "videoonly":
+            return not self._is_audio_included()
+
+        return True
+
+    def _get_native_extension(self):
+        if self.output_type == "audio":
+            return NATIVE_AUDIO_EXTENSIONS.get(self.audio.subtype, self.audio.subtype)
+
+        # Audio from a different container is merged into one that supports both
+        has_mismatched_audio = (
+            self.output_type == "videoaudio"
+            and self.has_external_audio
+            and self.audio.subtype != self.video.subtype
+        )
+        if has_mismatched_audio:
+            return MIXED_CONTAINERS_EXTENSION
+
+        return self.video.subtype
+
+    def _get_container_options(self):
+        if self._is_native_container():
+            return [*ConversionOptions.COPY_STREAMS]
+
+        return []
+
+    def _get_resumable_temporary_filename(self, stream_type: str):
+        stream = getattr(self, stream_type, None)
+
+        if stream is None:
+            return None
+
+        output_filename_hash = hashlib.sha1(self.filename.encode("utf-8")).hexdigest()
+
+        return (
+            f"{info.temporary_filename}-{self.source.video_id}-{stream.itag}"
+            f"-{stream.filesize}-{output_filename_hash[:8]}[{stream_type}].webm"
+        )
 
     def _is_audio_included(self):
         return self.video.is_progressive
 
     def _get_video_stream(self, definition):
-        if definition == "max":
-            video_stream = self.source.streams.filter(type="video").order_by(
-                "resolution"
-            )[-1]
-        else:
-            video_stream = self.source.streams.filter(
-                type="video", resolution=definition
-            )[-1]
-
-        return video_stream
+        return self.stream_index.get_stream("video", definition)
 
     def _get_audio_stream(self, definition):
-        if definition == "max":
-            audio_stream = self.source.streams.filter(type="audio").order_by("abr")[-1]
-        else:
-            audio_stream = self.source.streams.filter(type="audio", abr=definition)[-1]
-
-        return audio_stream
+        return self.stream_index.get_stream("audio", definition)
 
     def _include_external_audio(self):
         self.audio = self._get_audio_stream("max")
@@ -0,0 +1,62 @@
+from os import makedirs, path
+from threading import Lock
+
+from mediakit.globals import global_config
+
+
+class DownloadArchive:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.entries: "set[tuple]" = set()
+        self.lock = Lock()
+
+    def load(self):
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as archive_file:
+                for line in archive_file:
+                    entry = tuple(line.split())
+
+                    if len(entry) == 3:
+                        self.entries.add(entry)
+        except OSError:
+            pass
+
+    def contains(self, video_id: str, download_format: str, definition: str):
+        return (video_id, download_format, definition) in self.entries
+
+    def record(self, video_id: str, download_format: str, definition: str):
+        entry = (video_id, download_format, definition)
+
+        with self.lock:
+            if entry in self.entries:
+                return
+
+            self.entries.add(entry)
+
+            try:
+                archive_directory = path.dirname(self.file_path)
+                if archive_directory:
+                    makedirs(archive_directory, exist_ok=True)
+
+                with open(self.file_path, "a", encoding="utf-8") as archive_file:
+                    archive_file.write(" ".join(entry) + "\n")
+            except OSError:
+                pass
+
+
+_download_archive: DownloadArchive = None
+_download_archive_lock = Lock()
+
+
+def get_download_archive():
+    global _download_archive
+
+    if global_config.download_archive is None:
+        return None
+
+    with _download_archive_lock:
+        if _download_archive is None:
+            _download_archive = DownloadArchive(global_config.download_archive)
+            _download_archive.load()
+
+        return _download_archive
@@ -0,0 +1,67 @@
+from os import path, replace
+import json
+
+from mediakit.utils.files import file_exists, remove_file
+
+
+MANIFEST_EXTENSION = "json"
+
+
+class DownloadManifest:
+    def __init__(self, file_path: str, total_size: int):
+        self.file_path = f"{file_path}.{MANIFEST_EXTENSION}"
+        self.downloading_file_path = file_path
+        self.total_size = total_size
+
+        self.segments: "list[list[int]]" = []
+        # Set once the file is complete, until the file is removed
+        self.digest: str = None
+
+    def load(self):
+        if not file_exists(self.file_path) or not file_exists(
+            self.downloading_file_path
+        ):
+            return False
+
+        if path.getsize(self.downloading_file_path) != self.total_size:
+            return False
+
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return False
+
+        if manifest.get("total_size") != self.total_size:
+            return False
+
+        self.segments = [
+            [next_byte, last_byte] for next_byte, last_byte in manifest["segments"]
+        ]
+        self.digest = manifest.get("digest")
+        return True
+
+    def save(self):
+        partial_file_path = f"{self.file_path}.partial"
+
+        with open(partial_file_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(
+                {
+                    "total_size": self.total_size,
+                    "segments": self.segments,
+                    "digest": self.digest,
+                },
+                manifest_file,
+            )
+
+        replace(partial_file_path, self.file_path)
+
+    def remove(self):
+        remove_file(self.file_path)
+
+    def get_pending_segments(self) -> "list[tuple]":
+        return [
+            (segment_index, next_byte, last_byte)
+            for segment_index, (next_byte, last_byte) in enumerate(self.segments)
+            if next_byte <= last_byte
+        ]
@@ -0,0 +1,99 @@
+from os import path
+from threading import Lock
+import hashlib
+
+from mediakit import exceptions
+
+
+DIGEST_BLOCK_SIZE = 1024 * 1024
+
+
+# Hashes each fixed-size block separately, so blocks may arrive out of order
+# as long as the chunks of each block arrive in sequence
+class StreamDigest:
+    def __init__(self, total_size: int):
+        self.total_size = total_size
+        number_of_blocks = -(-total_size // DIGEST_BLOCK_SIZE)
+
+        self.block_hashers = [None for _ in range(number_of_blocks)]
+        self.block_bytes_received = [0 for _ in range(number_of_blocks)]
+        self.block_digests: "list[bytes]" = [None for _ in range(number_of_blocks)]
+
+        self.bytes_received = 0
+        self.lock = Lock()
+
+    def update(self, offset: int, chunk):
+        chunk_offset = 0
+
+        while chunk_offset < len(chunk):
+            block_index = (offset + chunk_offset) // DIGEST_BLOCK_SIZE
+            block_end = min((block_index + 1) * DIGEST_BLOCK_SIZE, self.total_size)
+            piece_size = min(
+                len(chunk) - chunk_offset, block_end - offset - chunk_offset
+            )
+
+            if piece_size <= 0:
+                raise exceptions.StreamIntegrityError()
+
+            self._update_block(
+                block_index, chunk[chunk_offset : chunk_offset + piece_size]
+            )
+            chunk_offset += piece_size
+
+        with self.lock:
+            self.bytes_received += len(chunk)
+
+    def verify(self, file_path: str = None):
+        is_complete = self.bytes_received == self.total_size and all(
+            block_digest is not None for block_digest in self.block_digests
+        )
+        has_expected_size = file_path is None or (
+            path.getsize(file_path) == self.total_size
+        )
+
+        if not is_complete or not has_expected_size:
+            raise exceptions.StreamIntegrityError()
+
+    def hexdigest(self):
+        return hashlib.sha256(b"".join(self.block_digests)).hexdigest()
+
+    def _update_block(self, block_index: int, piece):
+        block_hasher = self.block_hashers[block_index]
+        if block_hasher is None:
+            block_hasher = hashlib.sha256()
+            self.block_hashers[block_index] = block_hasher
+
+        block_hasher.update(piece)
+        self.block_bytes_received[block_index] += len(piece)
+
+        block_size = min(
+            DIGEST_BLOCK_SIZE, self.total_size - block_index * DIGEST_BLOCK_SIZE
+        )
+        if self.block_bytes_received[block_index] == block_size:
+            self.block_digests[block_index] = block_hasher.digest()
+            self.block_hashers[block_index] = None
+
+
+def compute_file_digest(file_path: str):
+    total_size = path.getsize(file_path)
+    digest = StreamDigest(total_size)
+
+    with open(file_path, "rb") as file:
+        offset = 0
+        while offset < total_size:
+            block = file.read(DIGEST_BLOCK_SIZE)
+            if not block:
+                break
+
+            digest.update(offset, block)
+            offset += len(block)
+
+    digest.verify()
+    return digest.hexdigest()
+
+
+def verify_stream_file(file_path: str, size: int, expected_digest: str):
+    if not path.isfile(file_path) or path.getsize(file_path) != size:
+        return False
+
+    return compute_file_digest(file_path) == expected_digest
@@ -0,0 +1,86 @@
+from os import makedirs, path, replace
+from time import time
+from urllib.parse import parse_qs, urlparse
+import json
+
+from mediakit.globals import global_config
+from mediakit.utils.files import remove_file
+
+
+MANIFEST_CACHE_DIRECTORY = "manifests"
+URL_EXPIRY_MARGIN = 30 * 60
+
+
+def _get_manifest_path(video_id: str):
+    return path.join(
+        global_config.data_directory, MANIFEST_CACHE_DIRECTORY, f"{video_id}.json"
+    )
+
+
+def get_stream_url_expiry(url: str):
+    expiry = parse_qs(urlparse(url).query).get("expire")
+
+    try:
+        return int(expiry[0]) if expiry else None
+    except ValueError:
+        return None
+
+
+def get_manifest_expiry(streams: "list[dict]", fetched_at: float):
+    expiry = fetched_at + global_config.manifest_cache_ttl
+
+    # Signed stream URLs stop working once they expire, so entries must be
+    # refreshed a little before the first of them does
+    for stream in streams:
+        url_expiry = get_stream_url_expiry(stream["url"])
+        if url_expiry is not None:
+            expiry = min(expiry, url_expiry - URL_EXPIRY_MARGIN)
+
+    return expiry
+
+
+def load_cached_manifest(video_id: str):
+    manifest_path = _get_manifest_path(video_id)
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+        is_valid_manifest = (
+            manifest["video_id"] == video_id
+            and isinstance(manifest["video_details"], dict)
+            and isinstance(manifest["streams"], list)
+        )
+        is_expired = manifest["expires_at"] <= time()
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    if not is_valid_manifest or is_expired:
+        remove_file(manifest_path)
+        return None
+
+    return manifest
+
+
+def save_cached_manifest(video_id: str, video_details: dict, streams: "list[dict]"):
+    manifest_path = _get_manifest_path(video_id)
+    partial_manifest_path = f"{manifest_path}.partial"
+
+    fetched_at = time()
+    manifest = {
+        "video_id": video_id,
+        "video_details": video_details,
+        "streams": streams,
+        "fetched_at": fetched_at,
+        "expires_at": get_manifest_expiry(streams, fetched_at),
+    }
+
+    try:
+        makedirs(path.dirname(manifest_path), exist_ok=True)
+
+        with open(partial_manifest_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        replace(partial_manifest_path, manifest_path)
+    except OSError:
+        pass
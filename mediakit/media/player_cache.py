@@ -0,0 +1,112 @@
+from os import makedirs, path, replace
+from threading import Lock
+import copy
+import hashlib
+
+from pytube import request
+from pytube.cipher import Cipher
+
+from mediakit.globals import global_config
+from mediakit.utils.files import remove_file
+
+
+PLAYER_CACHE_DIRECTORY = "players"
+PER_VIDEO_CIPHER_ATTRIBUTES = ("throttling_array", "calculated_n")
+
+
+class PlayerCache:
+    def __init__(self):
+        self.player_scripts: "dict[str, str]" = {}
+        self.ciphers: "dict[str, Cipher]" = {}
+
+        self.lock = Lock()
+        self.player_locks: "dict[str, Lock]" = {}
+
+    def get_player_script(self, player_url: str):
+        with self._get_player_lock(player_url):
+            player_script = self.player_scripts.get(player_url)
+
+            if player_script is None:
+                player_script = self._load_player_script(player_url)
+
+            if player_script is None:
+                player_script = request.get(player_url)
+                self._save_player_script(player_url, player_script)
+
+            self.player_scripts[player_url] = player_script
+            return player_script
+
+    def get_cipher(self, player_url: str, player_script: str):
+        with self._get_player_lock(player_url):
+            cipher = self.ciphers.get(player_url)
+
+            if cipher is None:
+                cipher = Cipher(js=player_script)
+                self.ciphers[player_url] = cipher
+
+        # Only the per-video state of pytube 15 ciphers is known to be reset
+        # by copying, so ciphers laid out differently are parsed for each video
+        if not all(
+            hasattr(cipher, attribute) for attribute in PER_VIDEO_CIPHER_ATTRIBUTES
+        ):
+            return Cipher(js=player_script)
+
+        # Ciphers keep the values computed for a video, so each video uses a
+        # fresh copy of the parsed one
+        cipher_copy = copy.copy(cipher)
+        cipher_copy.throttling_array = copy.deepcopy(cipher.throttling_array)
+        cipher_copy.calculated_n = None
+
+        return cipher_copy
+
+    def invalidate(self, player_url: str):
+        with self._get_player_lock(player_url):
+            self.player_scripts.pop(player_url, None)
+            self.ciphers.pop(player_url, None)
+
+            remove_file(self._get_player_script_path(player_url))
+
+    def _get_player_lock(self, player_url: str):
+        with self.lock:
+            return self.player_locks.setdefault(player_url, Lock())
+
+    def _get_player_script_path(self, player_url: str):
+        player_url_hash = hashlib.sha1(player_url.encode("utf-8")).hexdigest()
+
+        return path.join(
+            global_config.data_directory,
+            PLAYER_CACHE_DIRECTORY,
+            f"{player_url_hash}.js",
+        )
+
+    def _load_player_script(self, player_url: str):
+        if not global_config.cache_manifests:
+            return None
+
+        try:
+            with open(
+                self._get_player_script_path(player_url), "r", encoding="utf-8"
+            ) as player_file:
+                return player_file.read() or None
+        except (OSError, ValueError):
+            return None
+
+    def _save_player_script(self, player_url: str, player_script: str):
+        if not global_config.cache_manifests:
+            return
+
+        player_script_path = self._get_player_script_path(player_url)
+        partial_player_script_path = f"{player_script_path}.partial"
+
+        try:
+            makedirs(path.dirname(player_script_path), exist_ok=True)
+
+            with open(partial_player_script_path, "w", encoding="utf-8") as player_file:
+                player_file.write(player_script)
+
+            replace(partial_player_script_path, player_script_path)
+        except OSError:
+            pass
+
+
+player_cache = PlayerCache()
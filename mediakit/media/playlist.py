@@ -0,0 +1,98 @@
+from queue import Full, Queue
+from threading import Event, Semaphore, Thread
+from typing import Iterable, Iterator
+
+from pytube import Playlist
+
+from mediakit.utils import regex
+
+
+MAX_PLAYLISTS_EXPANDED_IN_PARALLEL = 4
+EXPANDED_VIDEO_URLS_BUFFER_SIZE = 256
+QUEUE_POLLING_INTERVAL = 0.1
+
+_end_of_video_urls = object()
+
+
+def get_playlist_video_urls(playlist_url: str) -> Iterator[str]:
+    # Each page of the playlist is only requested once the video URLs of the
+    # previous one have been consumed
+    return Playlist(playlist_url).url_generator()
+
+
+def expand_playlist_urls(
+    urls: Iterable[str],
+    max_playlists_in_parallel: int = MAX_PLAYLISTS_EXPANDED_IN_PARALLEL,
+    failed_playlist_urls: "list[str]" = None,
+) -> Iterator[str]:
+    video_urls = Queue(maxsize=EXPANDED_VIDEO_URLS_BUFFER_SIZE)
+    playlist_slots = Semaphore(max_playlists_in_parallel)
+    stopped = Event()
+    reading_errors: "list[Exception]" = []
+
+    def put_video_url(video_url):
+        while not stopped.is_set():
+            try:
+                video_urls.put(video_url, timeout=QUEUE_POLLING_INTERVAL)
+                return True
+            except Full:
+                continue
+
+        return False
+
+    def expand_playlist(playlist_url: str):
+        try:
+            for video_url in get_playlist_video_urls(playlist_url):
+                if not put_video_url(video_url):
+                    return
+        except Exception:
+            # The videos found before the failure are still downloaded, while
+            # the playlist is reported on its own instead of as a video
+            if failed_playlist_urls is not None:
+                failed_playlist_urls.append(playlist_url)
+        finally:
+            playlist_slots.release()
+
+    def read_urls():
+        expansion_threads: "list[Thread]" = []
+
+        try:
+            for url in urls:
+                if stopped.is_set():
+                    return
+
+                if not regex.is_youtube_playlist_url(url):
+                    put_video_url(url)
+                    continue
+
+                while not playlist_slots.acquire(timeout=QUEUE_POLLING_INTERVAL):
+                    if stopped.is_set():
+                        return
+
+                expansion_thread = Thread(
+                    target=expand_playlist, args=(url,), daemon=True
+                )
+                expansion_threads.append(expansion_thread)
+                expansion_thread.start()
+
+            for expansion_thread in expansion_threads:
+                expansion_thread.join()
+        except Exception as error:
+            reading_errors.append(error)
+        finally:
+            put_video_url(_end_of_video_urls)
+
+    Thread(target=read_urls, daemon=True).start()
+
+    try:
+        while True:
+            video_url = video_urls.get()
+            if video_url is _end_of_video_urls:
+                break
+
+            yield video_url
+    finally:
+        stopped.set()
+
+    if len(reading_errors) > 0:
+        raise reading_errors[0]
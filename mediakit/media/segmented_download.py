@@ -0,0 +1,380 @@
+from functools import partial
+from http.client import IncompleteRead
+from math import ceil
+from os import close, path
+from threading import Event, Lock, Thread
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+import socket
+
+from pytube import Stream, request
+
+from mediakit import exceptions
+from mediakit.media.download_manifest import DownloadManifest
+from mediakit.media.integrity import (
+    DIGEST_BLOCK_SIZE,
+    StreamDigest,
+    compute_file_digest,
+)
+from mediakit.utils.buffers import buffer_pool, get_chunk_size
+from mediakit.utils.files import (
+    open_for_positional_writes,
+    preallocate_file,
+    write_at,
+)
+from mediakit.utils.rate_limit import RateLimiter, consume_from_all
+
+
+MIN_SEGMENT_SIZE = 1024 * 1024
+MAX_RETRIES_PER_SEGMENT = 3
+REQUEST_TIMEOUT = 30
+MANIFEST_SAVE_INTERVAL = 4 * 1024 * 1024
+REQUEST_HEADERS = {"User-Agent": "Mozilla/5.0", "accept-language": "en-US,en"}
+
+# Set when the user interrupts the downloads, which then end at their next chunk
+downloads_stopped = Event()
+
+
+def get_segments(total_size: int, number_of_connections: int) -> "list[tuple]":
+    if total_size <= 0:
+        return []
+
+    number_of_blocks = ceil(total_size / DIGEST_BLOCK_SIZE)
+    number_of_segments = max(
+        1,
+        min(number_of_connections, total_size // MIN_SEGMENT_SIZE, number_of_blocks),
+    )
+    # Segments are made of whole digest blocks, so that each block is within
+    # one segment, and the blocks are spread evenly over all of them
+    block_boundaries = [
+        segment_index * number_of_blocks // number_of_segments
+        for segment_index in range(number_of_segments + 1)
+    ]
+
+    return [
+        (
+            first_block * DIGEST_BLOCK_SIZE,
+            min(last_block * DIGEST_BLOCK_SIZE, total_size) - 1,
+        )
+        for first_block, last_block in zip(block_boundaries, block_boundaries[1:])
+    ]
+
+
+def stream_range(
+    url: str,
+    first_byte: int,
+    last_byte: int,
+    total_size: int,
+    rate_limiters: "list[RateLimiter]" = [],
+):
+    request = Request(
+        url,
+        headers={**REQUEST_HEADERS, "Range": f"bytes={first_byte}-{last_byte}"},
+    )
+    response = urlopen(request, timeout=REQUEST_TIMEOUT)
+
+    is_partial_response = response.status == 206
+    is_whole_file = first_byte == 0 and last_byte == total_size - 1
+    if not is_partial_response and not is_whole_file:
+        response.close()
+        raise exceptions.RangeRequestsNotSupported()
+
+    chunk_size = get_chunk_size()
+
+    # Chunks are views of pooled buffers, valid only until the next one is read
+    with response:
+        while True:
+            if downloads_stopped.is_set():
+                raise exceptions.DownloadInterrupted()
+
+            buffer = buffer_pool.acquire(chunk_size.size)
+
+            try:
+                chunk_size.start_read()
+                number_of_bytes_read = response.readinto(buffer)
+                chunk_size.end_read()
+
+                if not number_of_bytes_read:
+                    break
+
+                consume_from_all(rate_limiters, number_of_bytes_read)
+                yield memoryview(buffer)[:number_of_bytes_read]
+            finally:
+                buffer_pool.release(buffer)
+
+
+def stream_sequentially(stream: Stream, rate_limiters: "list[RateLimiter]" = []):
+    try:
+        chunks = request.stream(stream.url)
+        for chunk in chunks:
+            if downloads_stopped.is_set():
+                raise exceptions.DownloadInterrupted()
+
+            consume_from_all(rate_limiters, len(chunk))
+            yield chunk
+    except HTTPError as error:
+        if error.code != 404:
+            raise error
+
+        # Some adaptive streams need to be requested with sequence numbers
+        for chunk in request.seq_stream(stream.url):
+            if downloads_stopped.is_set():
+                raise exceptions.DownloadInterrupted()
+
+            consume_from_all(rate_limiters, len(chunk))
+            yield chunk
+
+
+def _is_retryable_error(error: Exception):
+    if isinstance(error, URLError):
+        return isinstance(error.reason, socket.timeout)
+
+    return isinstance(error, (socket.timeout, IncompleteRead, ConnectionResetError))
+
+
+class _AlreadyWrittenChunks:
+    # Stream.on_progress writes each chunk to the given file handler before
+    # notifying the progress callbacks. Chunks written with pwrite are
+    # already on disk, so they are handed to this no-op writer instead.
+    def write(self, _chunk):
+        pass
+
+
+_already_written = _AlreadyWrittenChunks()
+
+
+class SegmentedDownload:
+    def __init__(
+        self,
+        stream: Stream,
+        file_path: str,
+        number_of_connections: int,
+        resumable: bool = False,
+        rate_limiters: "list[RateLimiter]" = [],
+    ):
+        self.stream = stream
+        self.file_path = file_path
+        self.number_of_connections = number_of_connections
+        self.rate_limiters = rate_limiters
+
+        self.total_size = stream.filesize
+        self.bytes_remaining = self.total_size
+
+        self.manifest = (
+            DownloadManifest(file_path, self.total_size) if resumable else None
+        )
+
+        self.digest = StreamDigest(self.total_size)
+        self.is_resuming = False
+
+        self.file_descriptor: int = None
+
+        self.progress_lock = Lock()
+        self.errors: "list[Exception]" = []
+
+    def start(self):
+        self.file_descriptor = open_for_positional_writes(self.file_path)
+
+        try:
+            pending_segments = self._get_pending_segments()
+            self.bytes_remaining = sum(
+                last_byte - next_byte + 1
+                for _, next_byte, last_byte in pending_segments
+            )
+
+            segment_threads = [
+                Thread(target=partial(self._download_segment, *segment))
+                for segment in pending_segments
+            ]
+
+            for thread in segment_threads:
+                thread.start()
+            for thread in segment_threads:
+                thread.join()
+        finally:
+            close(self.file_descriptor)
+
+        if len(self.errors) > 0:
+            raise self.errors[0]
+
+        # Bytes written by a previous run were not hashed, so read them back
+        if self.is_resuming:
+            digest = compute_file_digest(self.file_path)
+        else:
+            self.digest.verify(self.file_path)
+            digest = self.digest.hexdigest()
+
+        if self.manifest is not None:
+            self._mark_as_complete(digest)
+
+        return digest
+
+    def _mark_as_complete(self, digest: str):
+        # Files completed by a previous run must still match their digest
+        if self.manifest.digest is not None and self.manifest.digest != digest:
+            raise exceptions.StreamIntegrityError()
+
+        # The manifest is kept along with the file, so that a complete file
+        # waiting for its conversion is not downloaded again on resume
+        self.manifest.digest = digest
+        self.manifest.save()
+
+    def _get_pending_segments(self):
+        if self.manifest is not None and self.manifest.load():
+            self.is_resuming = True
+            return self.manifest.get_pending_segments()
+
+        preallocate_file(self.file_descriptor, self.total_size)
+
+        segments = get_segments(self.total_size, self.number_of_connections)
+
+        if self.manifest is not None:
+            self.manifest.segments = [
+                [first_byte, last_byte] for first_byte, last_byte in segments
+            ]
+            self.manifest.save()
+
+        return [
+            (segment_index, first_byte, last_byte)
+            for segment_index, (first_byte, last_byte) in enumerate(segments)
+        ]
+
+    def _download_segment(self, segment_index: int, first_byte: int, last_byte: int):
+        try:
+            next_byte = first_byte
+            retries = 0
+            while next_byte <= last_byte and len(self.errors) == 0:
+                if downloads_stopped.is_set():
+                    raise exceptions.DownloadInterrupted()
+
+                try:
+                    for chunk in stream_range(
+                        self.stream.url,
+                        next_byte,
+                        last_byte,
+                        self.total_size,
+                        rate_limiters=self.rate_limiters,
+                    ):
+                        self._write_chunk(chunk, next_byte)
+                        next_byte += len(chunk)
+
+                        if next_byte % MANIFEST_SAVE_INTERVAL < len(chunk):
+                            self._save_segment_progress(segment_index, next_byte)
+
+                    # Responses that end early are retried from the next byte
+                    if next_byte <= last_byte:
+                        raise IncompleteRead(b"", last_byte - next_byte + 1)
+                except Exception as error:
+                    retries += 1
+                    should_retry = (
+                        _is_retryable_error(error)
+                        and retries <= MAX_RETRIES_PER_SEGMENT
+                    )
+                    if not should_retry:
+                        raise error
+                finally:
+                    self._save_segment_progress(segment_index, next_byte)
+        except Exception as error:
+            self.errors.append(error)
+
+    def _write_chunk(self, chunk: memoryview, offset: int):
+        write_at(self.file_descriptor, chunk, offset)
+
+        if not self.is_resuming:
+            self.digest.update(offset, chunk)
+
+        with self.progress_lock:
+            self.bytes_remaining -= len(chunk)
+            self.stream.on_progress(chunk, _already_written, self.bytes_remaining)
+
+    def _save_segment_progress(self, segment_index: int, next_byte: int):
+        if self.manifest is None:
+            return
+
+        with self.progress_lock:
+            self.manifest.segments[segment_index][0] = next_byte
+            self.manifest.save()
+
+
+def pipe_stream(stream: Stream, pipe, rate_limiters: "list[RateLimiter]" = []):
+    total_size = stream.filesize
+    digest = StreamDigest(total_size)
+
+    next_byte = 0
+    retries = 0
+    while next_byte < total_size:
+        try:
+            for chunk in stream_range(
+                stream.url,
+                next_byte,
+                total_size - 1,
+                total_size,
+                rate_limiters=rate_limiters,
+            ):
+                digest.update(next_byte, chunk)
+                next_byte += len(chunk)
+                stream.on_progress(chunk, pipe, total_size - next_byte)
+
+            if next_byte < total_size:
+                raise IncompleteRead(b"", total_size - next_byte)
+        except Exception as error:
+            retries += 1
+            should_retry = (
+                _is_retryable_error(error) and retries <= MAX_RETRIES_PER_SEGMENT
+            )
+            if not should_retry:
+                raise error
+
+    digest.verify()
+    return digest.hexdigest()
+
+
+def download_stream(
+    stream: Stream,
+    output_path: str,
+    filename: str,
+    number_of_connections: int,
+    resumable: bool = False,
+    rate_limiters: "list[RateLimiter]" = [],
+):
+    file_path = path.join(output_path, filename)
+
+    # OTF streams are served in numbered sequences instead of byte ranges
+    if getattr(stream, "is_otf", False):
+        return _download_sequentially(stream, file_path, rate_limiters=rate_limiters)
+
+    try:
+        return SegmentedDownload(
+            stream,
+            file_path,
+            number_of_connections,
+            resumable=resumable,
+            rate_limiters=rate_limiters,
+        ).start()
+    except exceptions.RangeRequestsNotSupported:
+        # The whole file is downloaded again, so the manifest no longer applies
+        if resumable:
+            DownloadManifest(file_path, stream.filesize).remove()
+
+    # Servers that ignore Range still answer a request for the whole file
+    return SegmentedDownload(stream, file_path, 1, rate_limiters=rate_limiters).start()
+
+
+def _download_sequentially(
+    stream: Stream, file_path: str, rate_limiters: "list[RateLimiter]" = []
+):
+    total_size = stream.filesize
+    digest = StreamDigest(total_size)
+    bytes_remaining = total_size
+
+    with open(file_path, "wb") as file:
+        for chunk in stream_sequentially(stream, rate_limiters=rate_limiters):
+            if bytes_remaining < len(chunk):
+                raise exceptions.StreamIntegrityError()
+
+            digest.update(total_size - bytes_remaining, chunk)
+            bytes_remaining -= len(chunk)
+            stream.on_progress(chunk, file, bytes_remaining)
+
+    digest.verify(file_path)
+    return digest.hexdigest()
@@ -0,0 +1,76 @@
+from threading import Event, Lock
+from typing import Callable
+
+
+class SharedStreamDownload:
+    def __init__(self, temporary_filename: str):
+        self.temporary_filename = temporary_filename
+        self.subscribers: "list[tuple]" = []
+        self.users_left = 0
+
+        self.has_started = False
+        self.has_finished = Event()
+        self.error: Exception = None
+
+        self.lock = Lock()
+
+    def subscribe(self, media_resource, stream):
+        with self.lock:
+            self.subscribers.append((media_resource, stream))
+            self.users_left += 1
+
+    def run(self, download_function: Callable[[], None]):
+        with self.lock:
+            should_download = not self.has_started
+            self.has_started = True
+
+        if not should_download:
+            self.has_finished.wait()
+
+            if self.error is not None:
+                raise self.error
+            return
+
+        try:
+            download_function()
+        except Exception as error:
+            self.error = error
+            raise error
+        finally:
+            self.has_finished.set()
+
+    def report_bytes_remaining(self, bytes_remaining: int):
+        for media_resource, stream in self.subscribers:
+            media_resource.set_bytes_remaining(stream, bytes_remaining)
+
+    def release(self):
+        with self.lock:
+            self.users_left -= 1
+            return self.users_left == 0
+
+
+def get_stream_key(media_resource, stream):
+    return (media_resource.source.video_id, stream.itag, stream.filesize)
+
+
+def plan_shared_stream_downloads(media_resources: list):
+    users_by_stream: "dict[tuple, list[tuple]]" = {}
+
+    for media_resource in media_resources:
+        for stream_type, stream in media_resource.get_streams_to_download():
+            stream_key = get_stream_key(media_resource, stream)
+            users_by_stream.setdefault(stream_key, []).append(
+                (media_resource, stream_type, stream)
+            )
+
+    for stream_users in users_by_stream.values():
+        if len(stream_users) < 2:
+            continue
+
+        first_media_resource, first_stream_type, _ = stream_users[0]
+        shared_download = SharedStreamDownload(
+            first_media_resource.get_temporary_filename(first_stream_type)
+        )
+
+        for media_resource, stream_type, stream in stream_users:
+            media_resource.share_stream_download(stream_type, stream, shared_download)
@@ -0,0 +1,66 @@
+from pytube import Stream
+
+from mediakit.utils.format import parse_int
+
+
+STREAM_TYPES = ["video", "audio"]
+
+
+class StreamIndex:
+    def __init__(self, streams: "list[Stream]"):
+        self.streams_by_definition: "dict[tuple, list[Stream]]" = {}
+        self.number_of_streams = {stream_type: 0 for stream_type in STREAM_TYPES}
+        self.best_streams: "dict[str, Stream]" = {}
+
+        for stream in streams:
+            if stream.type not in STREAM_TYPES:
+                continue
+
+            definition = self._get_definition(stream)
+
+            self.streams_by_definition.setdefault((stream.type, definition), []).append(
+                stream
+            )
+            self.number_of_streams[stream.type] += 1
+
+            if definition is not None:
+                self._update_best_stream(stream, definition)
+
+        self.available_definitions = {
+            stream_type: self._sort_definitions(stream_type)
+            for stream_type in STREAM_TYPES
+        }
+
+    def has_definition(self, stream_type: str, definition: str):
+        if definition == "max":
+            return self.number_of_streams[stream_type] > 0
+
+        return (stream_type, definition) in self.streams_by_definition
+
+    def get_stream(self, stream_type: str, definition: str):
+        if definition == "max":
+            return self.best_streams.get(stream_type)
+
+        streams = self.streams_by_definition.get((stream_type, definition))
+        return streams[-1] if streams else None
+
+    def _sort_definitions(self, stream_type: str):
+        definitions = [
+            definition
+            for indexed_type, definition in self.streams_by_definition
+            if indexed_type == stream_type and definition is not None
+        ]
+
+        return list(reversed(sorted(definitions, key=parse_int)))
+
+    def _get_definition(self, stream: Stream):
+        return stream.resolution if stream.type == "video" else stream.abr
+
+    def _update_best_stream(self, stream: Stream, definition: str):
+        best_stream = self.best_streams.get(stream.type)
+
+        # Ties are won by the last stream, as in StreamQuery.order_by(...)[-1]
+        if best_stream is None or parse_int(definition) >= parse_int(
+            self._get_definition(best_stream)
+        ):
+            self.best_streams[stream.type] = stream
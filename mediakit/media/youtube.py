@@ -0,0 +1,153 @@
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from pytube import Stream, YouTube, exceptions, extract
+
+from mediakit.globals import global_config
+from mediakit.media.manifest_cache import load_cached_manifest, save_cached_manifest
+from mediakit.media.player_cache import player_cache
+
+
+def serialize_stream(stream: Stream):
+    serialized_stream = {
+        "url": stream.url,
+        "itag": stream.itag,
+        "mimeType": f'{stream.mime_type}; codecs="{", ".join(stream.codecs)}"',
+        "is_otf": stream.is_otf,
+        "bitrate": stream.bitrate,
+        "contentLength": stream._filesize,
+    }
+
+    if hasattr(stream, "fps"):
+        serialized_stream["fps"] = stream.fps
+
+    return serialized_stream
+
+
+class CachedYouTube(YouTube):
+    def __init__(self, url: str):
+        super().__init__(url)
+
+        self.was_loaded_from_cache = False
+        self._has_checked_manifest_cache = False
+
+    @property
+    def js(self):
+        if not self._js:
+            self._js = player_cache.get_player_script(self.js_url)
+
+        return self._js
+
+    @property
+    def fmt_streams(self):
+        if self._load_from_manifest_cache():
+            return self._fmt_streams
+
+        self.check_availability()
+        if self._fmt_streams:
+            return self._fmt_streams
+
+        stream_manifest = extract.apply_descrambler(self.streaming_data)
+
+        try:
+            self._apply_signature(stream_manifest)
+        except exceptions.ExtractError:
+            # The cached player may be outdated, so fetch it again and retry
+            player_cache.invalidate(self.js_url)
+            self._js = None
+            self._apply_signature(stream_manifest)
+
+        self._fmt_streams = [
+            Stream(stream=stream, monostate=self.stream_monostate)
+            for stream in stream_manifest
+        ]
+
+        self.stream_monostate.title = self.title
+        self.stream_monostate.duration = self.length
+
+        if global_config.cache_manifests:
+            save_cached_manifest(
+                self.video_id,
+                self.vid_info.get("videoDetails", {}),
+                [serialize_stream(stream) for stream in self._fmt_streams],
+            )
+
+        return self._fmt_streams
+
+    def check_availability(self):
+        # Only videos that were available get cached, so the watch page does
+        # not need to be fetched again to check it
+        if self._load_from_manifest_cache():
+            return
+
+        super().check_availability()
+
+    def _apply_signature(self, stream_manifest: "list[dict]"):
+        cipher = None
+
+        for stream in stream_manifest:
+            url = stream.get("url")
+
+            if url is None:
+                is_live_stream = self.vid_info.get("playabilityStatus", {}).get(
+                    "liveStreamability"
+                )
+                if is_live_stream:
+                    raise exceptions.LiveStreamError("UNKNOWN")
+                raise exceptions.ExtractError("stream without url")
+
+            is_presigned_url = "signature" in url or (
+                "s" not in stream and ("&sig=" in url or "&lsig=" in url)
+            )
+            if is_presigned_url:
+                continue
+
+            # Parsing the player is only needed for streams with ciphered URLs
+            if cipher is None:
+                cipher = player_cache.get_cipher(self.js_url, self.js)
+
+            parsed_url = urlparse(url)
+            query_params = {
+                name: values[0] for name, values in parse_qs(parsed_url.query).items()
+            }
+            query_params["sig"] = cipher.get_signature(ciphered_signature=stream["s"])
+
+            if "ratebypass" not in query_params:
+                query_params["n"] = cipher.calculate_n(list(query_params["n"]))
+
+            stream["url"] = (
+                f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
+                f"?{urlencode(query_params)}"
+            )
+
+    def _load_from_manifest_cache(self):
+        if self._has_checked_manifest_cache:
+            return self.was_loaded_from_cache
+
+        self._has_checked_manifest_cache = True
+
+        if not global_config.cache_manifests:
+            return False
+
+        manifest = load_cached_manifest(self.video_id)
+        if manifest is None:
+            return False
+
+        try:
+            fmt_streams = [
+                Stream(stream=stream, monostate=self.stream_monostate)
+                for stream in manifest["streams"]
+            ]
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return False
+
+        self._vid_info = {
+            "playabilityStatus": {"status": "OK"},
+            "videoDetails": manifest["video_details"],
+        }
+        self._fmt_streams = fmt_streams
+
+        self.stream_monostate.title = self.title
+        self.stream_monostate.duration = self.length
+
+        self.was_loaded_from_cache = True
+        return True
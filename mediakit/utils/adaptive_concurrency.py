@@ -0,0 +1,124 @@
+from os import makedirs, path
+from threading import Lock
+from time import monotonic
+import json
+
+from mediakit.globals import global_config
+
+
+CONCURRENCY_HINT_FILENAME = "concurrency_hint.json"
+MAX_ADAPTIVE_CONCURRENCY = 8
+
+
+class AdaptiveConcurrencyController:
+    def __init__(
+        self,
+        initial_concurrency: int = 1,
+        min_concurrency: int = 1,
+        max_concurrency: int = MAX_ADAPTIVE_CONCURRENCY,
+        improvement_threshold: float = 0.1,
+        stable_samples_before_probing: int = 5,
+    ):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.improvement_threshold = improvement_threshold
+        self.stable_samples_before_probing = stable_samples_before_probing
+
+        self.target_concurrency = self._clamp(initial_concurrency)
+        self.best_concurrency = self.target_concurrency
+
+        self.bytes_since_last_sample = 0
+        self.errors_since_last_sample = 0
+        self.last_sample_time = monotonic()
+        self.last_throughput = None
+        self.last_adjustment = 0
+        self.stable_samples = 0
+
+        self.lock = Lock()
+
+    def record_bytes(self, number_of_bytes: int):
+        with self.lock:
+            self.bytes_since_last_sample += number_of_bytes
+
+    def record_error(self):
+        with self.lock:
+            self.errors_since_last_sample += 1
+
+    def update(self):
+        with self.lock:
+            current_time = monotonic()
+            elapsed_time = current_time - self.last_sample_time
+            if elapsed_time <= 0:
+                return self.target_concurrency
+
+            throughput = self.bytes_since_last_sample / elapsed_time
+            had_errors = self.errors_since_last_sample > 0
+
+            self.bytes_since_last_sample = 0
+            self.errors_since_last_sample = 0
+            self.last_sample_time = current_time
+
+            self._adjust_target(throughput, had_errors)
+            self.last_throughput = throughput
+
+            return self.target_concurrency
+
+    def _adjust_target(self, throughput: float, had_errors: bool):
+        if had_errors:
+            self._change_target_by(-1)
+            self.best_concurrency = min(self.best_concurrency, self.target_concurrency)
+            return
+
+        if self.last_throughput is None:
+            self._change_target_by(1)
+            return
+
+        if self.last_adjustment > 0:
+            improvement = throughput - self.last_throughput
+            if improvement > self.last_throughput * self.improvement_threshold:
+                self.best_concurrency = self.target_concurrency
+                self._change_target_by(1)
+            else:
+                self._change_target_by(-1)
+            return
+
+        if self.stable_samples >= self.stable_samples_before_probing:
+            self._change_target_by(1)
+            return
+
+        self.last_adjustment = 0
+        self.stable_samples += 1
+
+    def _change_target_by(self, amount: int):
+        new_target = self._clamp(self.target_concurrency + amount)
+
+        self.last_adjustment = new_target - self.target_concurrency
+        self.target_concurrency = new_target
+        self.stable_samples = 0
+
+    def _clamp(self, concurrency: int):
+        return max(self.min_concurrency, min(concurrency, self.max_concurrency))
+
+
+def _get_concurrency_hint_path():
+    return path.join(global_config.data_directory, CONCURRENCY_HINT_FILENAME)
+
+
+def load_concurrency_hint():
+    try:
+        with open(_get_concurrency_hint_path(), "r", encoding="utf-8") as hint_file:
+            return int(json.load(hint_file)["max_downloads_in_parallel"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_concurrency_hint(max_downloads_in_parallel: int):
+    try:
+        makedirs(global_config.data_directory, exist_ok=True)
+
+        with open(_get_concurrency_hint_path(), "w", encoding="utf-8") as hint_file:
+            json.dump(
+                {"max_downloads_in_parallel": max_downloads_in_parallel}, hint_file
+            )
+    except OSError:
+        pass
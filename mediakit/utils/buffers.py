@@ -0,0 +1,91 @@
+from threading import Lock
+from time import monotonic
+
+from mediakit.globals import global_config
+
+
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+FAST_CHUNK_READ_DURATION = 0.05
+SLOW_CHUNK_READ_DURATION = 0.5
+
+MAX_IDLE_BUFFER_BYTES = 16 * 1024 * 1024
+
+
+class BufferPool:
+    def __init__(self, max_idle_bytes: int = MAX_IDLE_BUFFER_BYTES):
+        self.max_idle_bytes = max_idle_bytes
+
+        self.idle_buffers: "dict[int, list[bytearray]]" = {}
+        self.idle_bytes = 0
+        self.lock = Lock()
+
+    def acquire(self, buffer_size: int) -> bytearray:
+        with self.lock:
+            idle_buffers = self.idle_buffers.get(buffer_size)
+            if idle_buffers:
+                self.idle_bytes -= buffer_size
+                return idle_buffers.pop()
+
+        return bytearray(buffer_size)
+
+    def release(self, buffer: bytearray):
+        buffer_size = len(buffer)
+
+        with self.lock:
+            # Adaptive chunk sizes leave idle buffers of sizes no longer in use,
+            # so those are dropped first to make room
+            self._drop_idle_buffers_of_other_sizes(
+                buffer_size, self.idle_bytes + buffer_size - self.max_idle_bytes
+            )
+
+            if self.idle_bytes + buffer_size <= self.max_idle_bytes:
+                self.idle_buffers.setdefault(buffer_size, []).append(buffer)
+                self.idle_bytes += buffer_size
+
+    def _drop_idle_buffers_of_other_sizes(self, buffer_size: int, number_of_bytes: int):
+        for other_buffer_size in list(self.idle_buffers):
+            if number_of_bytes <= 0:
+                return
+            if other_buffer_size == buffer_size:
+                continue
+
+            idle_buffers = self.idle_buffers[other_buffer_size]
+            while len(idle_buffers) > 0 and number_of_bytes > 0:
+                idle_buffers.pop()
+                self.idle_bytes -= other_buffer_size
+                number_of_bytes -= other_buffer_size
+
+            if len(idle_buffers) == 0:
+                del self.idle_buffers[other_buffer_size]
+
+
+class ChunkSize:
+    def __init__(self, fixed_size: int = None):
+        self.is_adaptive = fixed_size is None
+        self.size = DEFAULT_CHUNK_SIZE if self.is_adaptive else fixed_size
+
+        self.read_started_at = None
+
+    def start_read(self):
+        self.read_started_at = monotonic()
+
+    def end_read(self):
+        if not self.is_adaptive or self.read_started_at is None:
+            return
+
+        read_duration = monotonic() - self.read_started_at
+
+        if read_duration < FAST_CHUNK_READ_DURATION:
+            self.size = min(self.size * 2, MAX_CHUNK_SIZE)
+        elif read_duration > SLOW_CHUNK_READ_DURATION:
+            self.size = max(self.size // 2, MIN_CHUNK_SIZE)
+
+
+def get_chunk_size():
+    return ChunkSize(global_config.chunk_size)
+
+
+buffer_pool = BufferPool()
@@ -1,13 +1,21 @@
-from os import devnull
 from shutil import which
 import subprocess
 
 
-def run_command_in_background(command):
-    with open(devnull, "w") as DEVNULL:
-        subprocess.run(
-            command, shell=True, stdout=DEVNULL, stderr=subprocess.STDOUT, check=True
-        )
+def start_process(arguments: "list[str]", stdin=None, stdout=subprocess.DEVNULL):
+    return subprocess.Popen(
+        arguments,
+        stdin=stdin,
+        stdout=stdout,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for_command(process: subprocess.Popen):
+    return_code = process.wait()
+
+    if return_code != 0:
+        raise subprocess.CalledProcessError(return_code, process.args)
 
 
 def is_command_available(command):
@@ -0,0 +1,209 @@
+from http.client import (
+    HTTPConnection,
+    HTTPException,
+    HTTPResponse,
+    HTTPSConnection,
+)
+from threading import Lock
+from urllib.error import URLError
+from urllib.request import HTTPHandler, HTTPSHandler, build_opener, install_opener
+import socket
+import ssl
+
+from mediakit.globals import global_config
+
+
+class PooledHTTPResponse(HTTPResponse):
+    release_connection = None
+    is_closing_early = False
+
+    def close(self):
+        self.is_closing_early = not self.isclosed()
+        super().close()
+        self._release(is_reusable=not self.is_closing_early)
+
+    def _close_conn(self):
+        super()._close_conn()
+        self._release(is_reusable=not self.is_closing_early)
+
+    def _release(self, is_reusable: bool):
+        release_connection = self.release_connection
+        self.release_connection = None
+
+        if release_connection is not None:
+            release_connection(is_reusable and not self.will_close)
+
+
+class _SocketBufferMixin:
+    socket_buffer_size: int = None
+
+    def connect(self):
+        super().connect()
+
+        if self.socket_buffer_size is not None:
+            self.sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, self.socket_buffer_size
+            )
+
+
+class PooledHTTPConnection(_SocketBufferMixin, HTTPConnection):
+    response_class = PooledHTTPResponse
+
+
+class PooledHTTPSConnection(_SocketBufferMixin, HTTPSConnection):
+    response_class = PooledHTTPResponse
+
+
+class ConnectionPool:
+    def __init__(self, max_idle_connections_per_host: int, socket_buffer_size=None):
+        self.max_idle_connections_per_host = max_idle_connections_per_host
+        self.socket_buffer_size = socket_buffer_size
+        self.ssl_context = ssl.create_default_context()
+
+        self.idle_connections: "dict[tuple, list[HTTPConnection]]" = {}
+        self.lock = Lock()
+
+    def acquire(self, scheme: str, host: str, timeout):
+        with self.lock:
+            idle_connections = self.idle_connections.get((scheme, host), [])
+            if len(idle_connections) > 0:
+                connection = idle_connections.pop()
+                self._update_timeout(connection, timeout)
+                return connection, True
+
+        if scheme == "https":
+            connection = PooledHTTPSConnection(
+                host, timeout=timeout, context=self.ssl_context
+            )
+        else:
+            connection = PooledHTTPConnection(host, timeout=timeout)
+
+        connection.socket_buffer_size = self.socket_buffer_size
+
+        return connection, False
+
+    def release(self, scheme: str, host: str, connection, is_reusable: bool):
+        if not is_reusable or connection.sock is None:
+            connection.close()
+            return
+
+        with self.lock:
+            idle_connections = self.idle_connections.setdefault((scheme, host), [])
+
+            if len(idle_connections) < self.max_idle_connections_per_host:
+                idle_connections.append(connection)
+                return
+
+        connection.close()
+
+    def close_all(self):
+        with self.lock:
+            for idle_connections in self.idle_connections.values():
+                for connection in idle_connections:
+                    connection.close()
+
+            self.idle_connections = {}
+
+    def _update_timeout(self, connection, timeout):
+        connection.timeout = timeout
+
+        if connection.sock is not None:
+            connection.sock.settimeout(
+                socket.getdefaulttimeout()
+                if timeout is socket._GLOBAL_DEFAULT_TIMEOUT
+                else timeout
+            )
+
+
+class _PooledHandlerMixin:
+    connection_pool: ConnectionPool = None
+    scheme: str = None
+
+    def _open_pooled(self, request):
+        for attempt in range(2):
+            connection, was_reused = self.connection_pool.acquire(
+                self.scheme, request.host, request.timeout
+            )
+
+            try:
+                response = self._send_request(connection, request)
+                break
+            except (OSError, HTTPException) as error:
+                connection.close()
+
+                # Idle connections may have been closed by the server meanwhile
+                should_retry_with_new_connection = was_reused and attempt == 0
+                if not should_retry_with_new_connection:
+                    raise URLError(error)
+
+        response.release_connection = (
+            lambda is_reusable: self.connection_pool.release(
+                self.scheme, request.host, connection, is_reusable
+            )
+        )
+
+        response.url = request.get_full_url()
+        response.msg = response.reason
+
+        if request.get_method() == "HEAD" or response.length == 0:
+            response.read()
+
+        return response
+
+    def _send_request(self, connection, request):
+        headers = dict(request.unredirected_hdrs)
+        headers.update(
+            (name, value)
+            for name, value in request.headers.items()
+            if name not in headers
+        )
+        headers["Connection"] = "keep-alive"
+        headers = {name.title(): value for name, value in headers.items()}
+
+        connection.request(
+            request.get_method(), request.selector, request.data, headers
+        )
+
+        return connection.getresponse()
+
+
+class PooledHTTPHandler(_PooledHandlerMixin, HTTPHandler):
+    scheme = "http"
+
+    def http_open(self, request):
+        return self._open_pooled(request)
+
+
+class PooledHTTPSHandler(_PooledHandlerMixin, HTTPSHandler):
+    scheme = "https"
+
+    def https_open(self, request):
+        is_tunneled_request = getattr(request, "_tunnel_host", None) is not None
+        if is_tunneled_request:
+            return super().https_open(request)
+
+        return self._open_pooled(request)
+
+
+_connection_pool: ConnectionPool = None
+
+
+def install_connection_pool():
+    global _connection_pool
+
+    _connection_pool = ConnectionPool(
+        global_config.connection_pool_size,
+        socket_buffer_size=global_config.socket_buffer_size,
+    )
+
+    http_handler = PooledHTTPHandler()
+    https_handler = PooledHTTPSHandler()
+    http_handler.connection_pool = _connection_pool
+    https_handler.connection_pool = _connection_pool
+
+    install_opener(build_opener(http_handler, https_handler))
+
+
+def close_connection_pool():
+    if _connection_pool is not None:
+        _connection_pool.close_all()
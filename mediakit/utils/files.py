@@ -1,7 +1,12 @@
 from os import path, listdir
+from threading import Lock
+from time import sleep
+import errno
+import os
 import re
+import shutil
+import uuid
 
-from mediakit.utils.commands import run_command_in_background
 from mediakit.info import temporary_filename
 from mediakit.utils import regex
 
@@ -11,15 +16,98 @@ def file_exists(file_path):
 
 
 def move_file(file_path, new_file_path):
-    move_command = f'mv "{file_path}" "{new_file_path}"'
+    try:
+        os.replace(file_path, new_file_path)
+        return
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise error
 
-    run_command_in_background(move_command)
+    # Files can only be renamed within the same filesystem, so files on other
+    # devices are copied next to their destination and renamed from there
+    partial_file_path = f"{new_file_path}.{uuid.uuid4().hex}.partial"
+
+    try:
+        shutil.copy2(file_path, partial_file_path)
+        os.replace(partial_file_path, new_file_path)
+    except OSError as error:
+        remove_file(partial_file_path)
+        raise error
+
+    os.unlink(file_path)
 
 
 def remove_file(file_path):
-    remove_command = f'rm -rf "{file_path}"'
+    try:
+        if path.isdir(file_path) and not path.islink(file_path):
+            shutil.rmtree(file_path)
+        else:
+            os.unlink(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def link_or_copy_file(file_path, new_file_path):
+    try:
+        os.link(file_path, new_file_path)
+    except OSError:
+        shutil.copyfile(file_path, new_file_path)
+
+
+def open_for_positional_writes(file_path):
+    return os.open(file_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+
+
+def preallocate_file(file_descriptor, size):
+    os.ftruncate(file_descriptor, size)
+
+    if hasattr(os, "posix_fallocate") and size > 0:
+        try:
+            os.posix_fallocate(file_descriptor, 0, size)
+        except OSError:
+            pass
+
+
+_positional_write_lock = Lock()
+
+
+def write_at(file_descriptor, data, offset):
+    if hasattr(os, "pwrite"):
+        while len(data) > 0:
+            bytes_written = os.pwrite(file_descriptor, data, offset)
+            data = data[bytes_written:]
+            offset += bytes_written
+        return
+
+    with _positional_write_lock:
+        os.lseek(file_descriptor, offset, os.SEEK_SET)
+        while len(data) > 0:
+            bytes_written = os.write(file_descriptor, data)
+            data = data[bytes_written:]
+
 
-    run_command_in_background(remove_command)
+def create_fifo(fifo_path):
+    os.mkfifo(fifo_path)
+
+
+def supports_fifos():
+    return hasattr(os, "mkfifo")
+
+
+def open_fifo_for_writing(fifo_path, is_reader_alive, retry_interval=0.05):
+    while True:
+        try:
+            fifo_descriptor = os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+            break
+        except OSError as error:
+            if error.errno != errno.ENXIO or not is_reader_alive():
+                raise error
+
+            sleep(retry_interval)
+
+    os.set_blocking(fifo_descriptor, True)
+
+    return os.fdopen(fifo_descriptor, "wb")
 
 
 def get_safe_filename(filename):
@@ -59,16 +147,35 @@ def increment_filename_if_exists(file_path):
 
 
 def read_video_urls_from(batch_file_path):
-    video_urls = []
-
+    # Lines are only read as they are consumed
     with open(batch_file_path, "r", encoding="utf-8") as batch_file:
         for line in batch_file:
             clear_line = line.strip()
 
-            if regex.is_youtube_video_url(clear_line):
-                video_urls.append(clear_line)
+            is_url_to_download = regex.is_youtube_video_url(
+                clear_line
+            ) or regex.is_youtube_playlist_url(clear_line)
+
+            if is_url_to_download:
+                yield clear_line
+
+
+def get_unique_video_urls(video_urls):
+    # Only the ids of the videos already seen are kept in memory
+    seen_video_ids = set()
+
+    for video_url in video_urls:
+        video_id = regex.extract_video_id(video_url)
+
+        if video_id is None:
+            yield video_url
+            continue
+
+        if video_id in seen_video_ids:
+            continue
 
-    return video_urls
+        seen_video_ids.add(video_id)
+        yield regex.get_video_url(video_id)
 
 
 def get_temporary_files(directory_path: str) -> "list[str]":
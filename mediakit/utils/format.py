@@ -27,3 +27,19 @@ def parse_int(string):
     integer_section = "".join(integer_section_as_list)
 
     return int(integer_section)
+
+
+DATA_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_data_size(string):
+    normalized_string = string.strip().upper().rstrip("B")
+    unit = normalized_string[-1:] if normalized_string[-1:] in DATA_SIZE_UNITS else ""
+    number_section = normalized_string[: len(normalized_string) - len(unit)]
+
+    size = float(number_section) * DATA_SIZE_UNITS[unit]
+
+    if size <= 0:
+        raise ValueError(f"invalid data size: '{string}'")
+
+    return size
@@ -0,0 +1,68 @@
+from threading import Lock
+from time import monotonic, sleep
+
+from mediakit.globals import global_config
+
+
+class RateLimiter:
+    def __init__(self, bytes_per_second: float, burst_size: float = None):
+        self.bytes_per_second = bytes_per_second
+        self.burst_size = burst_size if burst_size is not None else bytes_per_second
+
+        self.available_bytes = self.burst_size
+        self.last_refill_time = monotonic()
+        self.lock = Lock()
+
+    def consume(self, number_of_bytes: int):
+        with self.lock:
+            self._refill()
+            self.available_bytes -= number_of_bytes
+            missing_bytes = -self.available_bytes
+
+        if missing_bytes > 0:
+            sleep(missing_bytes / self.bytes_per_second)
+
+    def _refill(self):
+        current_time = monotonic()
+        elapsed_time = current_time - self.last_refill_time
+        self.last_refill_time = current_time
+
+        self.available_bytes = min(
+            self.available_bytes + elapsed_time * self.bytes_per_second,
+            self.burst_size,
+        )
+
+
+_global_rate_limiter: RateLimiter = None
+_global_rate_limiter_lock = Lock()
+
+
+def get_global_rate_limiter():
+    global _global_rate_limiter
+
+    if global_config.rate_limit is None:
+        return None
+
+    with _global_rate_limiter_lock:
+        if _global_rate_limiter is None:
+            _global_rate_limiter = RateLimiter(global_config.rate_limit)
+
+    return _global_rate_limiter
+
+
+def get_rate_limiters_for_download() -> "list[RateLimiter]":
+    rate_limiters = []
+
+    global_rate_limiter = get_global_rate_limiter()
+    if global_rate_limiter is not None:
+        rate_limiters.append(global_rate_limiter)
+
+    if global_config.rate_limit_per_download is not None:
+        rate_limiters.append(RateLimiter(global_config.rate_limit_per_download))
+
+    return rate_limiters
+
+
+def consume_from_all(rate_limiters: "list[RateLimiter]", number_of_bytes: int):
+    for rate_limiter in rate_limiters:
+        rate_limiter.consume(number_of_bytes)
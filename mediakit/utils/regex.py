@@ -44,6 +44,10 @@ def extract_video_id(video_url):
     return search(VIDEO_ID_REGEX, video_url, 1)
 
 
+def get_video_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
 def contains_video_id(string):
     video_id = extract_video_id(string)
     return video_id is not None
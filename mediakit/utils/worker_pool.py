@@ -0,0 +1,39 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator
+
+
+def run_in_bounded_pool(
+    function: Callable[[Any], Any],
+    items: Iterable,
+    number_of_workers: int,
+    prefetch_window: int = None,
+) -> Iterator[tuple]:
+    final_prefetch_window = max(prefetch_window or number_of_workers, 1)
+    indexed_items = enumerate(items)
+
+    with ThreadPoolExecutor(max_workers=max(number_of_workers, 1)) as executor:
+        pending_items: "dict[Future, tuple]" = {}
+
+        def submit_next_item():
+            for item_index, item in indexed_items:
+                pending_items[executor.submit(function, item)] = (item_index, item)
+                return True
+
+            return False
+
+        # Items are only consumed as results are yielded, so arbitrarily large
+        # inputs never have more than the prefetch window in flight
+        while len(pending_items) < final_prefetch_window and submit_next_item():
+            pass
+
+        while len(pending_items) > 0:
+            finished_items, _ = wait(pending_items, return_when=FIRST_COMPLETED)
+
+            for finished_item in finished_items:
+                item_index, item = pending_items.pop(finished_item)
+                submit_next_item()
+
+                error = finished_item.exception()
+                result = finished_item.result() if error is None else None
+
+                yield item_index, item, result, error
@@ -35,7 +35,7 @@ setup(
     ],
     python_requires=">=3.6",
     install_requires=[
-        "pytube>=11.0.2",
+        "pytube>=15.0.0",
         "clint",
         "imageio",
         "imageio-ffmpeg",